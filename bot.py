@@ -8,10 +8,12 @@ import subprocess
 import sys
 import threading
 import time
+from aiohttp import web
 from aiogram import Bot, Dispatcher
 from aiogram.client.session.aiohttp import AiohttpSession
 from aiogram.fsm.storage.memory import MemoryStorage
 from aiogram.types import BotCommand
+from aiogram.webhook.aiohttp_server import SimpleRequestHandler, setup_application
 
 from config import settings
 from core import database
@@ -27,10 +29,12 @@ from handlers import reminders as reminders_handler
 from handlers import import_questions as import_questions_handler
 from handlers import social as social_handler
 from handlers import reports as reports_handler
+from llm import client as llm_client
 from middlewares.access import AccessControlMiddleware
 from middlewares.throttle import ThrottleMiddleware
 from services.notification_service import init_scheduler
 from services.admin_web import start_admin_web
+from utils.background import run_in_background
 
 
 # Configure logging — stdout + файл (data/logs/bot.log)
@@ -320,8 +324,10 @@ async def main():
     dp = Dispatcher(storage=storage)
 
     # Access control middleware (проверка ролей)
-    dp.message.middleware(AccessControlMiddleware())
-    dp.callback_query.middleware(AccessControlMiddleware())
+    # Состояния у проверки нет — один экземпляр на оба типа событий
+    access_middleware = AccessControlMiddleware()
+    dp.message.middleware(access_middleware)
+    dp.callback_query.middleware(access_middleware)
 
     # Throttle middleware (защита от спама)
     dp.message.middleware(ThrottleMiddleware())
@@ -369,16 +375,22 @@ async def main():
     from services.notification_service import check_and_send_missed
     await check_and_send_missed(bot)
 
+    # Соединение с LLM открывается заранее, чтобы первый тест не ждал TCP/TLS
+    run_in_background(llm_client.prewarm())
+
     # Start admin web panel (optional)
     admin_web = await start_admin_web(bot)
 
-    # Start polling
+    # Start polling (или вебхук, если задан WEBHOOK_URL)
     try:
-        logger.info("Starting bot polling...")
-        await dp.start_polling(
-            bot,
-            allowed_updates=dp.resolve_used_update_types()
-        )
+        if settings.WEBHOOK_URL:
+            await _run_webhook(dp, bot)
+        else:
+            logger.info("Starting bot polling...")
+            await dp.start_polling(
+                bot,
+                allowed_updates=dp.resolve_used_update_types()
+            )
     except Exception as e:
         logger.error(f"Error during polling: {e}")
         raise
@@ -399,6 +411,38 @@ async def main():
         logger.info("Bot stopped")
 
 
+async def _run_webhook(dp: Dispatcher, bot: Bot) -> None:
+    """Принимать обновления вебхуком: Telegram сам присылает их, без цикла getUpdates."""
+    app = web.Application()
+    SimpleRequestHandler(
+        dispatcher=dp, bot=bot, secret_token=settings.WEBHOOK_SECRET,
+    ).register(app, path=settings.WEBHOOK_PATH)
+    setup_application(app, dp, bot=bot)
+
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, settings.WEBHOOK_HOST, settings.WEBHOOK_PORT)
+    await site.start()
+
+    url = settings.WEBHOOK_URL.rstrip("/") + settings.WEBHOOK_PATH
+    await bot.set_webhook(
+        url,
+        allowed_updates=dp.resolve_used_update_types(),
+        secret_token=settings.WEBHOOK_SECRET,
+    )
+    logger.info("Webhook set: %s (listening on %s:%d)", url, settings.WEBHOOK_HOST, settings.WEBHOOK_PORT)
+    try:
+        # Работаем до остановки (Ctrl+C отменяет main)
+        await asyncio.Event().wait()
+    finally:
+        # Иначе после возврата к polling getUpdates будет конфликтовать с вебхуком
+        try:
+            await bot.delete_webhook()
+        except Exception as e:
+            logger.warning("Failed to delete webhook: %s", e)
+        await runner.cleanup()
+
+
 if __name__ == "__main__":
     try:
         asyncio.run(main())
@@ -1,12 +1,36 @@
 """Database initialization and connection management."""
+import asyncio
 import logging
 import aiosqlite
 import os
+from contextlib import asynccontextmanager
 from pathlib import Path
-from typing import Optional
+from typing import AsyncIterator, Optional
 
 logger = logging.getLogger(__name__)
 
+# Настройки соединения: WAL позволяет читать параллельно с записью,
+# synchronous=NORMAL в режиме WAL делает fsync только на checkpoint.
+_CONNECTION_PRAGMAS = (
+    "PRAGMA synchronous = NORMAL",
+    "PRAGMA temp_store = MEMORY",
+    "PRAGMA cache_size = -64000",
+    "PRAGMA mmap_size = 268435456",
+)
+
+# Кэш подготовленных выражений sqlite3 (по умолчанию 128) ключуется текстом SQL.
+# В crud/сервисах больше сотни разных запросов, и горячие вытеснялись бы
+# редкими админскими — тогда каждый вызов заново компилирует SQL.
+STATEMENT_CACHE_SIZE = 512
+
+# Читающие соединения: в режиме WAL SQLite обслуживает их параллельно
+# с писателем, а у aiosqlite у каждого соединения свой поток.
+READ_POOL_SIZE = min(4, os.cpu_count() or 1)
+
+# Номер последней миграции; хранится в PRAGMA user_version и при совпадении
+# _run_migrations не трогает схему. Увеличивайте вместе с новой миграцией.
+SCHEMA_VERSION = 15
+
 
 class Database:
     """Database connection manager."""
@@ -14,6 +38,12 @@ class Database:
     def __init__(self, db_path: str):
         self.db_path = db_path
         self._conn: Optional[aiosqlite.Connection] = None
+        self._readers: list[aiosqlite.Connection] = []
+        self._readers_lock = asyncio.Lock()
+        self._next_reader = 0
+        # Писатель один на всех: запись и её commit идут под замком, иначе commit
+        # одной корутины зафиксирует незавершённую транзакцию другой
+        self._write_lock = asyncio.Lock()
 
     async def connect(self) -> aiosqlite.Connection:
         """Establish database connection."""
@@ -22,36 +52,91 @@ class Database:
             db_dir = Path(self.db_path).parent
             db_dir.mkdir(parents=True, exist_ok=True)
 
-            self._conn = await aiosqlite.connect(self.db_path)
+            self._conn = await aiosqlite.connect(
+                self.db_path, cached_statements=STATEMENT_CACHE_SIZE,
+            )
             # Enable foreign keys
             await self._conn.execute("PRAGMA foreign_keys = ON")
+            # In-memory БД (тесты) не поддерживает WAL — остальные PRAGMA безопасны
+            if self.db_path != ":memory:":
+                await self._conn.execute("PRAGMA journal_mode = WAL")
+            for pragma in _CONNECTION_PRAGMAS:
+                await self._conn.execute(pragma)
             # Row factory для доступа к колонкам по имени (поддерживает и row[0], и row["name"])
             self._conn.row_factory = aiosqlite.Row
             await self._conn.commit()
 
         return self._conn
 
+    async def _open_reader(self) -> aiosqlite.Connection:
+        """Open a read-only connection with the same PRAGMAs as the writer."""
+        conn = await aiosqlite.connect(self.db_path, cached_statements=STATEMENT_CACHE_SIZE)
+        await conn.execute("PRAGMA query_only = 1")
+        for pragma in _CONNECTION_PRAGMAS:
+            await conn.execute(pragma)
+        conn.row_factory = aiosqlite.Row
+        return conn
+
+    async def get_reader(self) -> aiosqlite.Connection:
+        """
+        Return a read-only connection from the pool (round-robin).
+
+        An in-memory database is private to its connection, so reads use the writer there.
+        """
+        if self.db_path == ":memory:":
+            return await self.connect()
+        if not self._readers:
+            async with self._readers_lock:
+                if not self._readers:
+                    # Писатель открывается первым: он создаёт каталог и включает WAL
+                    await self.connect()
+                    self._readers = [await self._open_reader() for _ in range(READ_POOL_SIZE)]
+        reader = self._readers[self._next_reader % len(self._readers)]
+        self._next_reader += 1
+        return reader
+
     async def close(self):
         """Close database connection."""
+        readers, self._readers = self._readers, []
+        for reader in readers:
+            await reader.close()
         if self._conn:
             await self._conn.close()
             self._conn = None
 
     async def execute(self, query: str, params: tuple = ()):
         """Execute a query."""
-        conn = await self.connect()
-        await conn.execute(query, params)
-        await conn.commit()
+        async with self.transaction() as conn:
+            async with conn.execute(query, params):
+                pass
+
+    @asynccontextmanager
+    async def transaction(self) -> AsyncIterator[aiosqlite.Connection]:
+        """
+        Exclusive write transaction on the writer connection.
+
+        BEGIN IMMEDIATE берёт блокировку записи SQLite сразу; при исключении
+        откатывается только начатое здесь, при успехе — один commit.
+        """
+        async with self._write_lock:
+            conn = await self.connect()
+            await conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+            except BaseException:
+                await conn.rollback()
+                raise
+            await conn.commit()
 
     async def fetchone(self, query: str, params: tuple = ()):
         """Fetch one result."""
-        conn = await self.connect()
+        conn = await self.get_reader()
         async with conn.execute(query, params) as cursor:
             return await cursor.fetchone()
 
     async def fetchall(self, query: str, params: tuple = ()):
         """Fetch all results."""
-        conn = await self.connect()
+        conn = await self.get_reader()
         async with conn.execute(query, params) as cursor:
             return await cursor.fetchall()
 
@@ -92,6 +177,13 @@ async def _run_migrations(conn: aiosqlite.Connection):
     """Применяет миграции для существующих БД (ALTER TABLE и т.п.)."""
     migrations_dir = Path(__file__).parent.parent / "database" / "migrations"
 
+    # Схема уже актуальна — не перечитываем файлы миграций на каждом старте
+    cursor = await conn.execute("PRAGMA user_version")
+    (schema_version,) = await cursor.fetchone()
+    if schema_version >= SCHEMA_VERSION:
+        await _ensure_admin(conn)
+        return
+
     # Проверяем, есть ли уже новые колонки (идемпотентность)
     cursor = await conn.execute("PRAGMA table_info(users)")
     user_columns = {row[1] for row in await cursor.fetchall()}
@@ -228,6 +320,84 @@ async def _run_migrations(conn: aiosqlite.Connection):
                     logger.debug("Migration 010 statement skipped: %s", e)
         await conn.commit()
 
+    # Миграция 011: индексы для истории квизов (сессии и ответы по пользователю)
+    migration_011 = migrations_dir / "011_quiz_indexes.sql"
+    if migration_011.exists():
+        with open(migration_011, "r", encoding="utf-8") as f:
+            sql = f.read()
+        for statement in sql.split(";"):
+            statement = statement.strip()
+            if statement:
+                try:
+                    await conn.execute(statement)
+                except Exception as e:
+                    logger.debug("Migration 011 statement skipped: %s", e)
+        await conn.commit()
+
+    # Миграция 012: user_id/language/topic в question_results (выборка без JOIN)
+    cursor = await conn.execute("PRAGMA table_info(question_results)")
+    qr_columns = {row[1] for row in await cursor.fetchall()}
+    if "user_id" not in qr_columns:
+        migration_012 = migrations_dir / "012_question_results_owner.sql"
+        if migration_012.exists():
+            with open(migration_012, "r", encoding="utf-8") as f:
+                sql = f.read()
+            for statement in sql.split(";"):
+                statement = statement.strip()
+                if statement:
+                    try:
+                        await conn.execute(statement)
+                    except Exception as e:
+                        logger.debug("Migration 012 statement skipped: %s", e)
+            await conn.commit()
+
+    # Миграция 013: битовая маска верных ответов в test_sessions
+    if "answers_bitmap" not in ts_columns:
+        migration_013 = migrations_dir / "013_answers_bitmap.sql"
+        if migration_013.exists():
+            with open(migration_013, "r", encoding="utf-8") as f:
+                sql = f.read()
+            for statement in sql.split(";"):
+                statement = statement.strip()
+                if statement:
+                    try:
+                        await conn.execute(statement)
+                    except Exception as e:
+                        logger.debug("Migration 013 statement skipped: %s", e)
+            await conn.commit()
+
+    # Миграция 014: персистентный кэш сгенерированных тестов
+    migration_014 = migrations_dir / "014_quiz_cache.sql"
+    if migration_014.exists():
+        with open(migration_014, "r", encoding="utf-8") as f:
+            sql = f.read()
+        for statement in sql.split(";"):
+            statement = statement.strip()
+            if statement:
+                try:
+                    await conn.execute(statement)
+                except Exception as e:
+                    logger.debug("Migration 014 statement skipped: %s", e)
+        await conn.commit()
+
+    # Миграция 015: удаление индекса question_results, дублирующего индекс по session_id
+    migration_015 = migrations_dir / "015_drop_duplicate_index.sql"
+    if migration_015.exists():
+        with open(migration_015, "r", encoding="utf-8") as f:
+            sql = f.read()
+        for statement in sql.split(";"):
+            statement = statement.strip()
+            if statement:
+                try:
+                    await conn.execute(statement)
+                except Exception as e:
+                    logger.debug("Migration 015 statement skipped: %s", e)
+        await conn.commit()
+
+    await conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+    await conn.commit()
+    logger.info("Схема БД обновлена до версии %d", SCHEMA_VERSION)
+
     await _ensure_admin(conn)
 
 
@@ -239,8 +409,13 @@ async def _ensure_admin(conn: aiosqlite.Connection):
         if not admin_id:
             return
         # Проверяем, есть ли уже такой пользователь
-        cursor = await conn.execute("SELECT 1 FROM users WHERE user_id = ?", (admin_id,))
+        cursor = await conn.execute(
+            "SELECT role, is_blocked FROM users WHERE user_id = ?", (admin_id,),
+        )
         exists = await cursor.fetchone()
+        if exists and exists[0] == "admin" and not exists[1]:
+            # Обычный старт: админ уже на месте, писать нечего
+            return
         if exists:
             await conn.execute(
                 "UPDATE users SET role = 'admin', is_blocked = 0 WHERE user_id = ?",
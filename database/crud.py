@@ -1,7 +1,9 @@
 """CRUD operations for database."""
+import asyncio
 import json
 import logging
 import secrets
+import time
 from typing import Optional, List, Dict
 from datetime import datetime, date
 
@@ -11,6 +13,24 @@ from core.encryption import encrypt, decrypt
 logger = logging.getLogger(__name__)
 
 
+def _forget_cached_token(user_id: int) -> None:
+    """Сбрасывает токен из in-process кэша token_manager после записи в users."""
+    from utils.token_manager import forget_cached_token  # избегаем циклического импорта
+    forget_cached_token(user_id)
+
+
+# Кэш is_user_allowed: роль и блокировка меняются редко, а проверяются на каждое
+# сообщение. Записи в users сбрасывают запись через _forget_access().
+ACCESS_CACHE_TTL_SECONDS = 60.0
+ACCESS_CACHE_MAX = 4096
+_access_cache: dict[int, tuple[float, tuple]] = {}
+
+
+def _forget_access(user_id: int) -> None:
+    """Сбрасывает закэшированный результат is_user_allowed для пользователя."""
+    _access_cache.pop(user_id, None)
+
+
 # ============================================================================
 # USER OPERATIONS
 # ============================================================================
@@ -79,6 +99,8 @@ async def create_user(
             mesh_profile_id, mesh_role,
         ))
 
+    _forget_cached_token(user_id)
+    _forget_access(user_id)
     return True
 
 
@@ -166,6 +188,7 @@ async def update_user_token(
     params.append(user_id)
     query = f"UPDATE users SET {', '.join(fields)} WHERE user_id = ?"
     await db.execute(query, tuple(params))
+    _forget_cached_token(user_id)
 
     return True
 
@@ -181,6 +204,7 @@ async def invalidate_token(user_id: int) -> bool:
 
     query = "UPDATE users SET token_expires_at = '2000-01-01T00:00:00' WHERE user_id = ?"
     await db.execute(query, (user_id,))
+    _forget_cached_token(user_id)
 
     return True
 
@@ -199,6 +223,8 @@ async def delete_user(user_id: int) -> bool:
     """Delete user and all related data (children, notifications cascade)."""
     db = get_db()
     await db.execute("DELETE FROM users WHERE user_id = ?", (user_id,))
+    _forget_cached_token(user_id)
+    _forget_access(user_id)
     return True
 
 
@@ -232,12 +258,11 @@ async def add_child(
         ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
     """
 
-    conn = await db.connect()
-    cursor = await conn.execute(query, (
-        user_id, student_id, first_name, last_name,
-        middle_name, class_name, school_name, person_id, class_unit_id,
-    ))
-    await conn.commit()
+    async with db.transaction() as conn:
+        cursor = await conn.execute(query, (
+            user_id, student_id, first_name, last_name,
+            middle_name, class_name, school_name, person_id, class_unit_id,
+        ))
 
     return cursor.lastrowid
 
@@ -674,15 +699,14 @@ async def get_last_notification_run(notification_type: str) -> Optional[str]:
 async def create_custom_reminder(user_id: int, reminder_text: str, reminder_time: str) -> int:
     """Создать пользовательское ежедневное напоминание. Возвращает reminder_id."""
     db = get_db()
-    conn = await db.connect()
-    cursor = await conn.execute(
-        """
-        INSERT INTO custom_reminders (user_id, reminder_text, reminder_time, is_enabled)
-        VALUES (?, ?, ?, 1)
-        """,
-        (user_id, reminder_text, reminder_time),
-    )
-    await conn.commit()
+    async with db.transaction() as conn:
+        cursor = await conn.execute(
+            """
+            INSERT INTO custom_reminders (user_id, reminder_text, reminder_time, is_enabled)
+            VALUES (?, ?, ?, 1)
+            """,
+            (user_id, reminder_text, reminder_time),
+        )
     return cursor.lastrowid
 
 
@@ -714,12 +738,11 @@ async def list_custom_reminders(user_id: int) -> List[Dict]:
 async def delete_custom_reminder(user_id: int, reminder_id: int) -> bool:
     """Удалить пользовательское напоминание по ID."""
     db = get_db()
-    conn = await db.connect()
-    cursor = await conn.execute(
-        "DELETE FROM custom_reminders WHERE user_id = ? AND reminder_id = ?",
-        (user_id, reminder_id),
-    )
-    await conn.commit()
+    async with db.transaction() as conn:
+        cursor = await conn.execute(
+            "DELETE FROM custom_reminders WHERE user_id = ? AND reminder_id = ?",
+            (user_id, reminder_id),
+        )
     return cursor.rowcount > 0
 
 
@@ -811,17 +834,33 @@ async def is_user_allowed(user_id: int) -> tuple:
 
     Returns:
         (is_allowed: bool, role: str | None)
+
+    Результат кэшируется на ACCESS_CACHE_TTL_SECONDS.
     """
+    now = time.monotonic()
+    cached = _access_cache.get(user_id)
+    if cached is not None and now - cached[0] < ACCESS_CACHE_TTL_SECONDS:
+        return cached[1]
+
     db = get_db()
     row = await db.fetchone(
         "SELECT role, is_blocked FROM users WHERE user_id = ?",
         (user_id,),
     )
     if row is None:
-        return (False, None)
-    if row[1]:  # is_blocked
-        return (False, row[0])
-    return (True, row[0])
+        result = (False, None)
+    elif row[1]:  # is_blocked
+        result = (False, row[0])
+    else:
+        result = (True, row[0])
+
+    # Обновлённая запись уходит в конец и не вытесняет чужую
+    _access_cache.pop(user_id, None)
+    if len(_access_cache) >= ACCESS_CACHE_MAX:
+        # Сначала самая старая запись (dict хранит порядок вставки)
+        _access_cache.pop(next(iter(_access_cache)))
+    _access_cache[user_id] = (now, result)
+    return result
 
 
 async def get_user_role(user_id: int) -> Optional[str]:
@@ -849,36 +888,47 @@ async def set_user_access(user_id: int, role: str = "student") -> None:
             "INSERT INTO users (user_id, role, is_blocked) VALUES (?, ?, 0)",
             (user_id, role),
         )
+    _forget_access(user_id)
 
 
-async def block_user(user_id: int) -> bool:
-    """Block a user. Returns True if user existed, False otherwise."""
+async def block_user(user_id: int) -> str:
+    """Block a user with a single conditional UPDATE.
+
+    Returns:
+        "blocked" — заблокирован этим вызовом,
+        "already_blocked" — уже был заблокирован,
+        "not_found" — пользователя нет в базе.
+    """
     db = get_db()
-    conn = await db.connect()
-    cursor = await conn.execute(
-        "UPDATE users SET is_blocked = 1 WHERE user_id = ?",
-        (user_id,),
-    )
-    await conn.commit()
-    return cursor.rowcount > 0
+    async with db.transaction() as conn:
+        cursor = await conn.execute(
+            "UPDATE users SET is_blocked = 1 "
+            "WHERE user_id = ? AND (is_blocked = 0 OR is_blocked IS NULL) RETURNING role",
+            (user_id,),
+        )
+        rows = await cursor.fetchall()
+    # Кэш сбрасывается при любом исходе: запись в нём могла устареть и без этого вызова
+    _forget_access(user_id)
+    if rows:
+        return "blocked"
+
+    # UPDATE ничего не изменил — отличаем «уже заблокирован» от «нет в базе»
+    exists = await db.fetchone("SELECT 1 FROM users WHERE user_id = ?", (user_id,))
+    return "already_blocked" if exists else "not_found"
 
 
-async def get_all_users_list() -> List[Dict]:
-    """Get all users with their roles and block status."""
+async def get_all_users_list(offset: int = 0, limit: int = 100) -> list:
+    """Get a page of users with their roles and block status.
+
+    Строки aiosqlite.Row отдаются как есть — поля доступны по имени
+    (row["role"]), промежуточные dict не создаются.
+    """
     db = get_db()
-    rows = await db.fetchall(
-        "SELECT user_id, first_name, username, role, is_blocked FROM users ORDER BY user_id"
+    return await db.fetchall(
+        "SELECT user_id, first_name, username, role, is_blocked FROM users "
+        "ORDER BY user_id LIMIT ? OFFSET ?",
+        (limit, offset),
     )
-    return [
-        {
-            "user_id": row[0],
-            "first_name": row[1],
-            "username": row[2],
-            "role": row[3],
-            "is_blocked": row[4],
-        }
-        for row in rows
-    ]
 
 
 async def ensure_quiz_user(
@@ -899,12 +949,31 @@ async def ensure_quiz_user(
             "INSERT INTO users (user_id, username, first_name, role) VALUES (?, ?, ?, 'student')",
             (user_id, username, first_name),
         )
+        _forget_access(user_id)
 
 
 # ============================================================================
 # QUIZ / TEST SESSIONS
 # ============================================================================
 
+def pack_answers_bitmap(answers: List[Dict]) -> bytes:
+    """Упаковывает верность ответов в битовую маску: бит i = вопрос i верный."""
+    mask = 0
+    for i, a in enumerate(answers):
+        if a.get("is_correct"):
+            mask |= 1 << i
+    return mask.to_bytes((len(answers) + 7) // 8, "little")
+
+
+# Сохранения сессий группируются: одна фоновая задача забирает всё, что накопилось
+# в очереди, и пишет одной транзакцией с одним executemany для ответов. Окна
+# ожидания нет: одиночная запись уходит сразу, а пакет собирается из записей,
+# пришедших, пока пишется предыдущий.
+SESSION_BATCH_MAX = 64
+_session_queue: Optional[asyncio.Queue] = None
+_session_flusher: Optional[asyncio.Task] = None
+
+
 async def save_test_session(
     user_id: int,
     language: str,
@@ -915,35 +984,95 @@ async def save_test_session(
     answers: List[Dict],
     difficulty: str | None = None,
 ) -> int:
-    """Save a completed test session and its individual question results."""
-    db = get_db()
-    conn = await db.connect()
+    """Save a completed test session and its individual question results.
+
+    Запись ставится в очередь пакетной записи; функция ждёт, пока пакет
+    будет записан, и возвращает id сессии (или пробрасывает ошибку записи).
+    """
+    global _session_queue, _session_flusher
+    if _session_flusher is None or _session_flusher.done():
+        _session_queue = asyncio.Queue()
+        _session_flusher = asyncio.create_task(_flush_test_sessions(_session_queue))
+
+    future = asyncio.get_running_loop().create_future()
+    record = (user_id, language, topic, total, correct, percent, answers, difficulty)
+    await _session_queue.put((future, record))
+    return await future
+
+
+async def _flush_test_sessions(queue: asyncio.Queue) -> None:
+    """Фоновая задача: собирает пакеты сохранений и пишет их в БД."""
+    while True:
+        batch = [await queue.get()]
+        while len(batch) < SESSION_BATCH_MAX and not queue.empty():
+            batch.append(queue.get_nowait())
+        await _write_session_batch(batch)
 
-    cursor = await conn.execute(
-        """INSERT INTO test_sessions (user_id, language, topic, total_questions, correct_answers, score_percent, difficulty)
-           VALUES (?, ?, ?, ?, ?, ?, ?)""",
-        (user_id, language, topic, total, correct, percent, difficulty),
-    )
-    session_id = cursor.lastrowid
 
-    for a in answers:
-        await conn.execute(
+async def _write_session_batch(batch: list) -> None:
+    """Пишет пакет и разрешает futures вызывающих; при ошибке пишет записи по одной."""
+    try:
+        session_ids = await _insert_test_sessions([record for _, record in batch])
+    except Exception as e:
+        if len(batch) > 1:
+            # Одна плохая запись не должна терять чужие результаты
+            for item in batch:
+                await _write_session_batch([item])
+            return
+        future, _ = batch[0]
+        if not future.done():
+            future.set_exception(e)
+        return
+
+    for (future, _), session_id in zip(batch, session_ids):
+        if not future.done():
+            future.set_result(session_id)
+
+
+async def _insert_test_sessions(records: list) -> List[int]:
+    """Вставляет сессии и все их ответы одной транзакцией BEGIN IMMEDIATE.
+
+    Блокировка записи берётся один раз на пакет, а при ошибке откатывается
+    весь пакет: сессий без ответов не остаётся. Транзакция идёт под замком
+    писателя, поэтому чужой commit не зафиксирует её на середине.
+    """
+    db = get_db()
+    async with db.transaction() as conn:
+        session_ids = []
+        answer_rows = []
+        for user_id, language, topic, total, correct, percent, answers, difficulty in records:
+            cursor = await conn.execute(
+                """INSERT INTO test_sessions
+                   (user_id, language, topic, total_questions, correct_answers, score_percent, difficulty, answers_bitmap)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?)""",
+                (user_id, language, topic, total, correct, percent, difficulty, pack_answers_bitmap(answers)),
+            )
+            session_id = cursor.lastrowid
+            session_ids.append(session_id)
+            answer_rows.extend(
+                (
+                    session_id,
+                    user_id,
+                    language,
+                    topic,
+                    a.get("question_type", ""),
+                    a.get("question_text", ""),
+                    a.get("correct_answer", ""),
+                    a.get("user_answer", ""),
+                    1 if a.get("is_correct") else 0,
+                    a.get("explanation", ""),
+                )
+                for a in answers
+            )
+
+        await conn.executemany(
             """INSERT INTO question_results
-               (session_id, question_type, question_text, correct_answer, user_answer, is_correct, explanation)
-               VALUES (?, ?, ?, ?, ?, ?, ?)""",
-            (
-                session_id,
-                a.get("question_type", ""),
-                a.get("question_text", ""),
-                a.get("correct_answer", ""),
-                a.get("user_answer", ""),
-                1 if a.get("is_correct") else 0,
-                a.get("explanation", ""),
-            ),
+               (session_id, user_id, language, topic,
+                question_type, question_text, correct_answer, user_answer, is_correct, explanation)
+               VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+            answer_rows,
         )
-
-    await conn.commit()
-    return session_id
+    return session_ids
 
 
 async def get_user_sessions(user_id: int, limit: int = 10) -> List[Dict]:
@@ -994,19 +1123,54 @@ async def get_weak_topics(user_id: int) -> List[Dict]:
     ]
 
 
+async def get_topic_progress(user_id: int) -> tuple[List[Dict], Dict]:
+    """
+    Weak topics and overall stats for a user in one pass over test_sessions.
+
+    Returns (weak topics as in get_weak_topics, summary as in get_stats_summary).
+    """
+    db = get_db()
+    rows = await db.fetchall(
+        """SELECT language, topic, AVG(score_percent) as avg_score, COUNT(*) as attempts,
+                  SUM(score_percent), SUM(total_questions), SUM(correct_answers)
+           FROM test_sessions
+           WHERE user_id = ?
+           GROUP BY language, topic
+           ORDER BY avg_score ASC""",
+        (user_id,),
+    )
+    weak = [
+        {
+            "language": row[0],
+            "topic": row[1],
+            "avg_score": row[2],
+            "attempts": row[3],
+        }
+        for row in rows
+        if row[2] < 70
+    ]
+    total_tests = sum(row[3] for row in rows)
+    summary = {
+        "total_tests": total_tests,
+        "avg_score": sum(row[4] for row in rows) / total_tests if total_tests else None,
+        "total_questions_answered": sum(row[5] for row in rows) if rows else None,
+        "total_correct": sum(row[6] for row in rows) if rows else None,
+    }
+    return weak, summary
+
+
 async def get_recent_questions(
     user_id: int, language: str, topic: str, limit: int = 50,
 ) -> List[str]:
     """Get recent question texts for deduplication."""
     db = get_db()
     rows = await db.fetchall(
-        """SELECT qr.question_text
-           FROM question_results qr
-           JOIN test_sessions ts ON qr.session_id = ts.id
-           WHERE ts.user_id = ?
-             AND ts.language = ?
-             AND ts.topic = ?
-           ORDER BY ts.finished_at DESC, qr.id DESC
+        """SELECT question_text
+           FROM question_results
+           WHERE user_id = ?
+             AND language = ?
+             AND topic = ?
+           ORDER BY id DESC
            LIMIT ?""",
         (user_id, language, topic, limit),
     )
@@ -1127,22 +1291,42 @@ async def award_badge(user_id: int, badge_key: str) -> bool:
         return False
 
 
-async def get_distinct_languages(user_id: int) -> int:
-    """Count distinct languages/subjects the user has tested."""
+async def award_badges(user_id: int, badge_keys: List[str]) -> None:
+    """Award several badges with one commit; already earned ones are skipped."""
+    if not badge_keys:
+        return
+    db = get_db()
+    async with db.transaction() as conn:
+        await conn.executemany(
+            "INSERT OR IGNORE INTO achievements (user_id, badge_key) VALUES (?, ?)",
+            [(user_id, badge_key) for badge_key in badge_keys],
+        )
+
+
+async def get_distinct_languages(user_id: int, include: str | None = None) -> int:
+    """Count distinct languages/subjects the user has tested.
+
+    include — язык ещё не сохранённой сессии: учитывается, даже если её нет в БД.
+    """
     db = get_db()
     row = await db.fetchone(
-        "SELECT COUNT(DISTINCT language) FROM test_sessions WHERE user_id = ?",
-        (user_id,),
+        "SELECT COUNT(language) FROM "
+        "(SELECT language FROM test_sessions WHERE user_id = ? UNION SELECT ?)",
+        (user_id, include),
     )
     return row[0] if row else 0
 
 
-async def get_distinct_topics(user_id: int) -> int:
-    """Count distinct topics the user has tested."""
+async def get_distinct_topics(user_id: int, include: str | None = None) -> int:
+    """Count distinct topics the user has tested.
+
+    include — тема ещё не сохранённой сессии: учитывается, даже если её нет в БД.
+    """
     db = get_db()
     row = await db.fetchone(
-        "SELECT COUNT(DISTINCT topic) FROM test_sessions WHERE user_id = ?",
-        (user_id,),
+        "SELECT COUNT(topic) FROM "
+        "(SELECT topic FROM test_sessions WHERE user_id = ? UNION SELECT ?)",
+        (user_id, include),
     )
     return row[0] if row else 0
 
@@ -1204,18 +1388,17 @@ async def save_imported_questions(
 ) -> int:
     """Save imported questions to question bank."""
     db = get_db()
-    conn = await db.connect()
     inserted = 0
-    for question in questions:
-        await conn.execute(
-            """
-            INSERT INTO imported_questions (user_id, language, level, topic, question_json)
-            VALUES (?, ?, ?, ?, ?)
-            """,
-            (user_id, language, level, topic, json.dumps(question, ensure_ascii=False)),
-        )
-        inserted += 1
-    await conn.commit()
+    async with db.transaction() as conn:
+        for question in questions:
+            await conn.execute(
+                """
+                INSERT INTO imported_questions (user_id, language, level, topic, question_json)
+                VALUES (?, ?, ?, ?, ?)
+                """,
+                (user_id, language, level, topic, json.dumps(question, ensure_ascii=False)),
+            )
+            inserted += 1
     return inserted
 
 
@@ -1248,6 +1431,38 @@ async def get_imported_questions(
     return result
 
 
+async def save_cached_quiz(cache_key: str, questions: List[Dict], created_at: float) -> None:
+    """Сохранить сгенерированный тест в персистентный кэш (перезаписывает ключ)."""
+    db = get_db()
+    await db.execute(
+        "INSERT OR REPLACE INTO quiz_cache (cache_key, questions_json, created_at) VALUES (?, ?, ?)",
+        (cache_key, json.dumps(questions, ensure_ascii=False), created_at),
+    )
+
+
+async def get_cached_quiz(cache_key: str, max_age_seconds: float) -> Optional[tuple[float, List[Dict]]]:
+    """Тест из персистентного кэша не старше max_age_seconds: (created_at, вопросы) или None."""
+    db = get_db()
+    row = await db.fetchone(
+        "SELECT questions_json, created_at FROM quiz_cache WHERE cache_key = ? AND created_at >= ?",
+        (cache_key, time.time() - max_age_seconds),
+    )
+    if not row:
+        return None
+    try:
+        questions = json.loads(row[0])
+    except (TypeError, ValueError):
+        logger.warning("Skipping broken cached quiz %s", cache_key)
+        return None
+    return row[1], questions
+
+
+async def delete_expired_cached_quizzes(max_age_seconds: float) -> None:
+    """Удалить из кэша тесты старше max_age_seconds."""
+    db = get_db()
+    await db.execute("DELETE FROM quiz_cache WHERE created_at < ?", (time.time() - max_age_seconds,))
+
+
 async def get_xp_leaderboard(limit: int = 10) -> List[Dict]:
     """Top students by total XP."""
     db = get_db()
@@ -1608,16 +1823,15 @@ async def create_admin_broadcast(
 ) -> int:
     """Create broadcast run and return run id."""
     db = get_db()
-    conn = await db.connect()
-    cursor = await conn.execute(
-        """
-        INSERT INTO admin_broadcasts
-            (initiated_by, message_text, target_roles, total_targets, status)
-        VALUES (?, ?, ?, ?, ?)
-        """,
-        (initiated_by, message_text, json.dumps(roles, ensure_ascii=False), total_targets, status),
-    )
-    await conn.commit()
+    async with db.transaction() as conn:
+        cursor = await conn.execute(
+            """
+            INSERT INTO admin_broadcasts
+                (initiated_by, message_text, target_roles, total_targets, status)
+            VALUES (?, ?, ?, ?, ?)
+            """,
+            (initiated_by, message_text, json.dumps(roles, ensure_ascii=False), total_targets, status),
+        )
     return int(cursor.lastrowid)
 
 
@@ -0,0 +1,12 @@
+-- v1.6.1: индексы под запросы истории квизов
+
+-- get_user_sessions / последняя сессия: WHERE user_id = ? ORDER BY finished_at DESC
+CREATE INDEX IF NOT EXISTS idx_test_sessions_user_finished
+    ON test_sessions(user_id, finished_at DESC);
+
+-- get_weak_topics / get_recent_questions: фильтр по пользователю, языку и теме
+CREATE INDEX IF NOT EXISTS idx_test_sessions_user_lang_topic
+    ON test_sessions(user_id, language, topic, finished_at DESC);
+
+-- Для question_results отдельный индекс не нужен: id — это rowid, и
+-- idx_question_results_session(session_id) из 003 уже упорядочен по нему
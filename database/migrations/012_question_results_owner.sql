@@ -0,0 +1,14 @@
+-- v1.6.1: владелец и тема вопроса прямо в question_results,
+-- чтобы get_recent_questions читал одну таблицу без JOIN с test_sessions
+
+ALTER TABLE question_results ADD COLUMN user_id INTEGER;
+ALTER TABLE question_results ADD COLUMN language TEXT;
+ALTER TABLE question_results ADD COLUMN topic TEXT;
+
+UPDATE question_results
+SET user_id = (SELECT ts.user_id FROM test_sessions ts WHERE ts.id = question_results.session_id),
+    language = (SELECT ts.language FROM test_sessions ts WHERE ts.id = question_results.session_id),
+    topic = (SELECT ts.topic FROM test_sessions ts WHERE ts.id = question_results.session_id);
+
+CREATE INDEX IF NOT EXISTS idx_question_results_user_lang_topic
+    ON question_results(user_id, language, topic, id DESC);
@@ -0,0 +1,3 @@
+-- Migration 013: packed per-question correctness for test_sessions
+-- Бит i (little-endian) = ответ на вопрос i верный, у старых сессий NULL
+ALTER TABLE test_sessions ADD COLUMN answers_bitmap BLOB DEFAULT NULL;
@@ -0,0 +1,9 @@
+-- Migration 014: сгенерированные LLM тесты переживают перезапуск бота
+-- cache_key = язык|уровень|тема|число вопросов, created_at — unix-время генерации
+CREATE TABLE IF NOT EXISTS quiz_cache (
+    cache_key TEXT PRIMARY KEY,
+    questions_json TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_quiz_cache_created ON quiz_cache(created_at);
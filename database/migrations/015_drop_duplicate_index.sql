@@ -0,0 +1,4 @@
+-- Migration 015: (session_id, id DESC) из 011 дублировал idx_question_results_session.
+-- id — псевдоним rowid, а rowid и так хранится в каждом индексе, поэтому индекс по
+-- session_id уже отдаёт ответы сессии в порядке id, а второй индекс только удорожал вставки
+DROP INDEX IF EXISTS idx_question_results_session_id;
@@ -12,6 +12,10 @@ router = Router()
 
 VALID_ROLES = {"student", "admin", "parent"}
 
+# /users отдаёт список страницами: сообщение Telegram ограничено 4096 символами
+USERS_PAGE_SIZE = 50
+_USER_ROLE_LABELS = {"admin": "👑 admin", "parent": "👨‍👩‍👧 parent", "student": "📚 student"}
+
 _home_kb = InlineKeyboardMarkup(inline_keyboard=[[home_button()]])
 
 
@@ -32,7 +36,8 @@ async def cmd_allow(message: Message):
     if not await _check_admin(message):
         return
 
-    parts = message.text.split()
+    # Нужны только команда, id и роль — хвост сообщения не разбиваем
+    parts = message.text.split(maxsplit=3)
     if len(parts) < 2:
         await message.answer(
             "Формат: /allow <user_id> [student|parent|admin]\n"
@@ -41,7 +46,7 @@ async def cmd_allow(message: Message):
         return
 
     raw_id = parts[1]
-    if not raw_id.isdigit():
+    if not raw_id.isdecimal():
         await message.answer("user_id должен быть числом.")
         return
 
@@ -68,13 +73,13 @@ async def cmd_block(message: Message):
     if not await _check_admin(message):
         return
 
-    parts = message.text.split()
+    parts = message.text.split(maxsplit=2)
     if len(parts) < 2:
         await message.answer("Формат: /block <user_id>")
         return
 
     raw_id = parts[1]
-    if not raw_id.isdigit():
+    if not raw_id.isdecimal():
         await message.answer("user_id должен быть числом.")
         return
 
@@ -88,13 +93,11 @@ async def cmd_block(message: Message):
         await message.answer("Нельзя заблокировать главного администратора.")
         return
 
-    allowed, role = await is_user_allowed(target_id)
-    if role is not None and not allowed:
+    result = await block_user(target_id)
+    if result == "already_blocked":
         await message.answer("Пользователь уже заблокирован.")
         return
-
-    result = await block_user(target_id)
-    if not result:
+    if result == "not_found":
         await message.answer("Пользователь не найден в базе.")
         return
 
@@ -103,22 +106,29 @@ async def cmd_block(message: Message):
 
 @router.message(Command("users"))
 async def cmd_users(message: Message):
-    """List all users: /users"""
+    """List users page by page: /users [page]"""
     if not await _check_admin(message):
         return
 
-    users = await get_all_users_list()
+    parts = message.text.split(maxsplit=2)
+    page = int(parts[1]) if len(parts) >= 2 and parts[1].isdecimal() else 1
+    page = max(page, 1)
+
+    # Берём на одну строку больше, чтобы узнать, есть ли следующая страница
+    users = await get_all_users_list(offset=(page - 1) * USERS_PAGE_SIZE, limit=USERS_PAGE_SIZE + 1)
     if not users:
-        await message.answer("Список пользователей пуст.")
+        await message.answer("Список пользователей пуст." if page == 1 else "На этой странице никого нет.")
         return
 
-    lines = ["👥 Список пользователей:\n"]
-    for u in users:
+    has_next = len(users) > USERS_PAGE_SIZE
+    lines = [f"👥 Список пользователей (стр. {page}):\n"]
+    for u in users[:USERS_PAGE_SIZE]:
         name = u["first_name"] or u["username"] or str(u["user_id"])
         status = "🚫 заблокирован" if u["is_blocked"] else "✅ активен"
-        role_labels = {"admin": "👑 admin", "parent": "👨‍👩‍👧 parent", "student": "📚 student"}
-        role_label = role_labels.get(u["role"], u["role"] or "?")
+        role_label = _USER_ROLE_LABELS.get(u["role"], u["role"] or "?")
         lines.append(f"• {name} (ID: {u['user_id']}) — {role_label}, {status}")
+    if has_next:
+        lines.append(f"\nДальше: /users {page + 1}")
 
     await message.answer("\n".join(lines), reply_markup=_home_kb)
 
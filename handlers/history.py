@@ -1,10 +1,12 @@
 """Quiz history and statistics handler."""
+import asyncio
+
 from aiogram import Router, F
 from aiogram.types import CallbackQuery
 from aiogram.fsm.context import FSMContext
 
 from keyboards.main_menu import quiz_home_keyboard
-from services.progress_tracker import format_history, format_weak_areas, format_overall_stats
+from services.progress_tracker import format_progress_report
 from services.gamification import format_gamification_header
 from database.crud import get_user_stats, get_user_badges
 
@@ -17,11 +19,16 @@ async def show_history(callback: CallbackQuery, state: FSMContext):
 
     user_id = callback.from_user.id
 
+    # Независимые чтения идут параллельно через пул читающих соединений
+    stats, badges, (history, weak, overall) = await asyncio.gather(
+        get_user_stats(user_id),
+        get_user_badges(user_id),
+        format_progress_report(user_id),
+    )
+
     # Gamification header
     gamification_header = ""
-    stats = await get_user_stats(user_id)
     if stats:
-        badges = await get_user_badges(user_id)
         gamification_header = format_gamification_header(
             theme_key=stats.get("theme") or "neutral",
             streak=stats.get("current_streak", 0),
@@ -30,10 +37,6 @@ async def show_history(callback: CallbackQuery, state: FSMContext):
             badge_count=len(badges),
         ) + "\n\n"
 
-    history = await format_history(user_id)
-    weak = await format_weak_areas(user_id)
-    overall = await format_overall_stats(user_id)
-
     text = gamification_header + history
     if weak:
         text += "\n" + weak
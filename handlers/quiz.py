@@ -1,8 +1,10 @@
 """Quiz flow handlers — answering questions, cancel, results."""
+import asyncio
 import logging
 import os
 import time
 import base64
+from collections import OrderedDict
 from io import BytesIO
 from datetime import date
 
@@ -19,16 +21,54 @@ from services.gamification import (
     calculate_xp, update_streak, check_badges, level_from_xp,
     format_results_text, get_theme, progress_bar,
 )
+from llm.parser import LETTER_INDEX
 from keyboards.quiz_kb import multiple_choice_keyboard, true_false_keyboard, cancel_keyboard
 from keyboards.main_menu import quiz_home_keyboard
+from utils.background import run_in_background
 
 router = Router()
 
-
-async def _send_audio_question(message: Message, header: str, question: dict):
-    """Send audio-type question using Telegram voice/audio when available."""
+# Текст вопроса по типу (без заголовка с прогрессом).
+# Аудио-вопросы отправляются несколькими сообщениями — см. _send_audio_question
+_RENDERERS = {
+    "multiple_choice": lambda q: q["question"],
+    "true_false": lambda q: q["question"],
+    "fill_blank": lambda q: q["question"] + "\n\n✏️ Напиши ответ (пропущенное слово):",
+    "translation": lambda q: q["question"] + "\n\n✏️ Напиши перевод:",
+    "matching": lambda q: (
+        q["question"] + "\n\n✏️ Напиши соответствие в одну строку (например: термин:определение)."
+    ),
+}
+
+# Клавиатура по типу. Фабрики кэшированы, поэтому в состоянии FSM её не храним:
+# там только строки, и данные остаются сериализуемыми
+_KEYBOARDS = {
+    "multiple_choice": lambda q: multiple_choice_keyboard(q["options"]),
+    "true_false": lambda q: true_false_keyboard(),
+    "fill_blank": lambda q: cancel_keyboard(),
+    "translation": lambda q: cancel_keyboard(),
+    "matching": lambda q: cancel_keyboard(),
+}
+
+# Типы вопросов, которые умеет показывать _send_current_question; остальные пропускаются
+_KNOWN_TYPES = frozenset(_RENDERERS) | {"audio"}
+
+# Повторные нажатия кнопки ответа в пределах этого окна отбрасываются
+ANSWER_DEBOUNCE_SECONDS = 0.3
+# Замки на чат: ответы одного чата обрабатываются строго по очереди, иначе
+# двойное нажатие продвигает индекс дважды. Хранятся в ограниченном LRU.
+ANSWER_LOCK_CACHE_MAX = 1024
+_answer_locks: OrderedDict[int, asyncio.Lock] = OrderedDict()
+_last_press: dict[int, float] = {}
+
+
+async def _send_audio_question(message: Message, header: str, question: dict) -> Message:
+    """Send audio-type question using Telegram voice/audio when available.
+
+    Returns the text message with the keyboard; the audio follows it.
+    """
     text = header + question["question"] + "\n\n🎧 Прослушай и напиши ответ:"
-    await message.answer(text, reply_markup=cancel_keyboard())
+    question_msg = await message.answer(text, reply_markup=cancel_keyboard())
 
     # Preferred source: Telegram file_id (best for production reliability)
     audio_file_id = question.get("audio_file_id")
@@ -38,7 +78,7 @@ async def _send_audio_question(message: Message, header: str, question: dict):
             await message.answer_audio(audio=audio_file_id)
         else:
             await message.answer_voice(voice=audio_file_id)
-        return
+        return question_msg
 
     # Optional source: HTTP URL
     audio_url = question.get("audio_url")
@@ -48,7 +88,7 @@ async def _send_audio_question(message: Message, header: str, question: dict):
             await message.answer_voice(voice=audio_url)
         else:
             await message.answer_audio(audio=audio_url)
-        return
+        return question_msg
 
     # Optional source: local file path
     audio_path = question.get("audio_path")
@@ -59,7 +99,7 @@ async def _send_audio_question(message: Message, header: str, question: dict):
             await message.answer_voice(voice=input_file)
         else:
             await message.answer_audio(audio=input_file)
-        return
+        return question_msg
 
     # Optional source: base64 payload
     audio_b64 = question.get("audio_base64")
@@ -73,7 +113,7 @@ async def _send_audio_question(message: Message, header: str, question: dict):
                 await message.answer_audio(audio=input_file)
             else:
                 await message.answer_voice(voice=input_file)
-            return
+            return question_msg
         except Exception:
             logger.warning("Invalid audio_base64 in question payload")
 
@@ -83,6 +123,7 @@ async def _send_audio_question(message: Message, header: str, question: dict):
         await message.answer(f"🔊 Аудио (текстовая версия): {audio_text}")
     else:
         await message.answer("⚠️ Для этого вопроса аудио не найдено. Напиши ответ по условию.")
+    return question_msg
 
 
 async def _download_telegram_media_bytes(message: Message) -> tuple[bytes | None, str]:
@@ -113,71 +154,141 @@ async def _download_telegram_media_bytes(message: Message) -> tuple[bytes | None
 async def start_quiz(message: Message, state: FSMContext):
     """Send the first question of the quiz."""
     await state.set_state(QuizFlow.answering_question)
-    await state.update_data(question_sent_at=time.time(), answer_times=[])
-    await _send_current_question(message, state)
-
-
-async def _send_current_question(message: Message, state: FSMContext):
-    """Send the current question based on its type."""
     data = await state.get_data()
+    # Отрисовка и id сообщения прошлого квиза в этом чате не должны переходить в новый
+    progress = {
+        "question_sent_at": time.time(),
+        "answer_times": [],
+        "rendered": _prerender_questions(data["questions"], data["question_count"]),
+        "last_question_msg_id": None,
+    }
+    await state.update_data(**progress)
+    data.update(progress)
+    await _send_current_question(message, state, data)
+
+
+async def _send_current_question(
+    message: Message, state: FSMContext, data: dict | None = None, feedback: str = "",
+):
+    """Send the current question based on its type.
+
+    data — уже прочитанное и обновлённое состояние FSM, чтобы не читать его повторно.
+    feedback — отзыв на предыдущий ответ; уходит в одном сообщении со следующим вопросом.
+    """
+    if data is None:
+        data = await state.get_data()
     questions = data["questions"]
     index = data["current_index"]
     total = data["question_count"]
 
+    # Вопросы неизвестного типа пропускаем за один проход, без рекурсии
+    # и промежуточных записей в FSM на каждый пропуск
+    start_index = index
+    while index < len(questions) and questions[index]["type"] not in _KNOWN_TYPES:
+        index += 1
+
     if index >= len(questions):
+        if index != start_index:
+            await state.update_data(current_index=index)
+        if feedback:
+            await message.answer(feedback)
         await _show_results(message, state)
         return
 
-    q = questions[index]
-    q_type = q["type"]
-
-    # Progress bar header
-    correct_so_far = data["correct_count"]
-    pbar = progress_bar(index, total)
-    header = f"\u2753 \u0412\u043e\u043f\u0440\u043e\u0441 {index + 1}/{total} {pbar}\n\u2705 {correct_so_far} \u043f\u0440\u0430\u0432\u0438\u043b\u044c\u043d\u044b\u0445\n\n"
-
-    # Record when question was sent (for speed bonus)
-    await state.update_data(question_sent_at=time.time())
-
-    if q_type == "multiple_choice":
-        text = header + q["question"]
-        await message.answer(text, reply_markup=multiple_choice_keyboard(q["options"]))
-
-    elif q_type == "true_false":
-        text = header + q["question"]
-        await message.answer(text, reply_markup=true_false_keyboard())
-
-    elif q_type == "fill_blank":
-        text = header + q["question"] + "\n\n\u270f\ufe0f \u041d\u0430\u043f\u0438\u0448\u0438 \u043e\u0442\u0432\u0435\u0442 (\u043f\u0440\u043e\u043f\u0443\u0449\u0435\u043d\u043d\u043e\u0435 \u0441\u043b\u043e\u0432\u043e):"
-        await message.answer(text, reply_markup=cancel_keyboard())
-
-    elif q_type == "translation":
-        text = header + q["question"] + "\n\n\u270f\ufe0f \u041d\u0430\u043f\u0438\u0448\u0438 \u043f\u0435\u0440\u0435\u0432\u043e\u0434:"
-        await message.answer(text, reply_markup=cancel_keyboard())
-
-    elif q_type == "matching":
-        text = (
-            header
-            + q["question"]
-            + "\n\n✏️ Напиши соответствие в одну строку "
-              "(например: термин:определение)."
-        )
-        await message.answer(text, reply_markup=cancel_keyboard())
-
-    elif q_type == "audio":
-        await _send_audio_question(message, header, q)
-
+    # Статичные части вопросов строятся один раз за квиз (в start_quiz) и хранятся в состоянии
+    sent = {}
+    rendered = data.get("rendered")
+    if rendered is None:
+        rendered = _prerender_questions(questions, total)
+        sent["rendered"] = rendered
+    title, body = rendered[index]
+
+    # Progress bar header: меняется только счётчик правильных ответов
+    header = f"{title}\u2705 {data['correct_count']} \u043f\u0440\u0430\u0432\u0438\u043b\u044c\u043d\u044b\u0445\n\n"
+    if feedback:
+        # Отзыв и следующий вопрос — одно сообщение, а не два запроса к Telegram
+        header = feedback + "\n\n" + header
+
+    if body is None:
+        question_msg = await _send_audio_question(message, header, questions[index])
     else:
-        await state.update_data(current_index=index + 1)
-        await _send_current_question(message, state)
+        q = questions[index]
+        question_msg = await message.answer(header + body, reply_markup=_KEYBOARDS[q["type"]](q))
+
+    # Record when question was sent (for speed bonus) and which message has the keyboard
+    sent["question_sent_at"] = time.time()
+    sent["last_question_msg_id"] = question_msg.message_id
+    if index != start_index:
+        sent["current_index"] = index
+    await state.update_data(**sent)
+
+
+def _prerender_questions(questions: list[dict], total: int) -> list[tuple]:
+    """Заголовок с прогрессом и текст каждого вопроса: (title, body).
+
+    Для аудио и неизвестных типов body — None.
+    """
+    rendered = []
+    for i, q in enumerate(questions):
+        title = f"\u2753 \u0412\u043e\u043f\u0440\u043e\u0441 {i + 1}/{total} {progress_bar(i, total)}\n"
+        render = _RENDERERS.get(q["type"])
+        rendered.append((title, render(q) if render else None))
+    return rendered
+
+
+def _get_answer_lock(chat_id: int) -> asyncio.Lock:
+    """Вернуть замок чата, вытесняя давно не использованные свободные замки."""
+    lock = _answer_locks.get(chat_id)
+    if lock is not None:
+        _answer_locks.move_to_end(chat_id)
+        return lock
+
+    lock = asyncio.Lock()
+    _answer_locks[chat_id] = lock
+    if len(_answer_locks) > ANSWER_LOCK_CACHE_MAX:
+        for key in list(_answer_locks):
+            if len(_answer_locks) <= ANSWER_LOCK_CACHE_MAX:
+                break
+            if not _answer_locks[key].locked():
+                del _answer_locks[key]
+                _last_press.pop(key, None)
+    return lock
+
+
+async def _process_answer_locked(
+    message: Message, state: FSMContext, user_answer: str, question_msg_id: int | None = None,
+):
+    """Обработать ответ под замком чата, если квиз ещё идёт.
+
+    question_msg_id — сообщение, на кнопку которого нажали; ответ с клавиатуры
+    уже пройденного вопроса отбрасывается.
+    """
+    async with _get_answer_lock(message.chat.id):
+        # Пока ждали замок, предыдущий ответ мог завершить квиз
+        if await state.get_state() != QuizFlow.answering_question.state:
+            return
+        if question_msg_id is not None:
+            current_msg_id = (await state.get_data()).get("last_question_msg_id")
+            if current_msg_id is not None and current_msg_id != question_msg_id:
+                return
+        await _process_answer(message, state, user_answer)
 
 
 @router.callback_query(QuizFlow.answering_question, F.data.startswith("ans:"))
 async def answer_via_button(callback: CallbackQuery, state: FSMContext):
     """Handle answers from inline keyboard buttons."""
+    chat_id = callback.message.chat.id
+    now = time.monotonic()
+    if now - _last_press.get(chat_id, 0.0) < ANSWER_DEBOUNCE_SECONDS:
+        run_in_background(callback.answer("Ответ уже принят"))
+        return
+    _last_press[chat_id] = now
+
     user_answer = callback.data.split(":", 1)[1]
-    await callback.answer()
-    await _process_answer(callback.message, state, user_answer)
+    run_in_background(callback.answer())
+    await _process_answer_locked(
+        callback.message, state, user_answer, question_msg_id=callback.message.message_id,
+    )
 
 
 @router.message(QuizFlow.answering_question, F.text)
@@ -187,7 +298,7 @@ async def answer_via_text(message: Message, state: FSMContext):
     if not user_answer:
         await message.answer("\u041d\u0430\u043f\u0438\u0448\u0438 \u043e\u0442\u0432\u0435\u0442 \u0442\u0435\u043a\u0441\u0442\u043e\u043c:")
         return
-    await _process_answer(message, state, user_answer)
+    await _process_answer_locked(message, state, user_answer)
 
 
 @router.message(QuizFlow.answering_question, F.voice)
@@ -207,7 +318,7 @@ async def answer_via_voice(message: Message, state: FSMContext):
         return
 
     await message.answer(f"📝 Распознано: {text}")
-    await _process_answer(message, state, text)
+    await _process_answer_locked(message, state, text)
 
 
 @router.message(QuizFlow.answering_question, F.audio)
@@ -227,7 +338,7 @@ async def answer_via_audio(message: Message, state: FSMContext):
         return
 
     await message.answer(f"📝 Распознано: {text}")
-    await _process_answer(message, state, text)
+    await _process_answer_locked(message, state, text)
 
 
 @router.callback_query(F.data == "cancel_quiz")
@@ -238,7 +349,7 @@ async def cancel_quiz(callback: CallbackQuery, state: FSMContext):
         "\u0422\u0435\u0441\u0442 \u043e\u0442\u043c\u0435\u043d\u0451\u043d. \u0412\u043e\u0437\u0432\u0440\u0430\u0449\u0430\u0435\u043c\u0441\u044f \u0432 \u043c\u0435\u043d\u044e.",
         reply_markup=quiz_home_keyboard(),
     )
-    await callback.answer()
+    run_in_background(callback.answer())
 
 
 async def _process_answer(message: Message, state: FSMContext, user_answer: str):
@@ -250,6 +361,15 @@ async def _process_answer(message: Message, state: FSMContext, user_answer: str)
     answers = data["answers"]
     answer_times = data.get("answer_times", [])
 
+    # Кнопки отвеченного вопроса убираем, чтобы на него нельзя было ответить повторно.
+    # Запрос идёт параллельно с проверкой и отправкой следующего вопроса
+    last_question_msg_id = data.get("last_question_msg_id")
+    remove_keyboard = None
+    if last_question_msg_id:
+        remove_keyboard = run_in_background(message.bot.edit_message_reply_markup(
+            chat_id=message.chat.id, message_id=last_question_msg_id, reply_markup=None,
+        ))
+
     # Calculate answer time
     question_sent_at = data.get("question_sent_at", time.time())
     elapsed = time.time() - question_sent_at
@@ -267,33 +387,70 @@ async def _process_answer(message: Message, state: FSMContext, user_answer: str)
         feedback = theme["correct_msg"]
     else:
         correct_display = q["correct"]
-        if len(correct_display) == 1 and correct_display.upper() in "ABCD" and q.get("options"):
-            idx = ord(correct_display.upper()) - ord("A")
-            if 0 <= idx < len(q["options"]):
-                correct_display = q["options"][idx]
+        options = q.get("options")
+        idx = LETTER_INDEX.get(correct_display)
+        if idx is not None and options and idx < len(options):
+            correct_display = options[idx]
         feedback = f"{theme['wrong_msg']}\n\n\U0001f4dd \u041f\u0440\u0430\u0432\u0438\u043b\u044c\u043d\u044b\u0439 \u043e\u0442\u0432\u0435\u0442: {correct_display}"
         explanation = q.get("explanation", "")
         if explanation:
             feedback += f"\n\n\U0001f4a1 {explanation}"
 
-    answers.append({
-        "question_type": q["type"],
-        "question_text": q["question"],
-        "correct_answer": q["correct"],
-        "user_answer": user_answer,
-        "is_correct": is_correct,
-        "explanation": q.get("explanation", ""),
-    })
-
-    await state.update_data(
-        current_index=index + 1,
-        correct_count=correct_count,
-        answers=answers,
-        answer_times=answer_times,
-    )
-
-    await message.answer(feedback)
-    await _send_current_question(message, state)
+    # Списки дополняются на месте: MemoryStorage хранит ссылки, и update_data
+    # не копирует накопленные ответы заново на каждом вопросе.
+    # В состоянии только (индекс вопроса, ответ, верно ли) — текст вопроса,
+    # правильный ответ и пояснение берутся из questions при сохранении
+    answers.append((index, user_answer, is_correct))
+
+    progress = {
+        "current_index": index + 1,
+        "correct_count": correct_count,
+        "answers": answers,
+        "answer_times": answer_times,
+    }
+    await state.update_data(**progress)
+    data.update(progress)
+
+    await _send_current_question(message, state, data, feedback=feedback)
+
+    if remove_keyboard is not None:
+        # Обработка ответа заканчивается, когда старая клавиатура уже снята;
+        # ошибку Telegram (например, сообщение удалено) только логируем
+        await asyncio.gather(remove_keyboard, return_exceptions=True)
+
+
+def _expand_answers(questions: list[dict], answers: list[tuple[int, str, bool]]) -> list[dict]:
+    """Собрать полные записи ответов для сохранения из компактных кортежей состояния."""
+    expanded = []
+    for index, user_answer, is_correct in answers:
+        q = questions[index]
+        expanded.append({
+            "question_type": q["type"],
+            "question_text": q["question"],
+            "correct_answer": q["correct"],
+            "user_answer": user_answer,
+            "is_correct": is_correct,
+            "explanation": q.get("explanation", ""),
+        })
+    return expanded
+
+
+async def _persist_session(
+    user_id: int,
+    language: str,
+    topic: str,
+    total: int,
+    correct: int,
+    percent: float,
+    answers: list,
+    difficulty: str | None,
+) -> None:
+    """Save the finished session; errors are logged, not raised."""
+    try:
+        from database.crud import save_test_session
+        await save_test_session(user_id, language, topic, total, correct, percent, answers, difficulty=difficulty)
+    except Exception as e:
+        logger.error("Failed to save test session for user_id=%s: %s", user_id, e)
 
 
 async def _show_results(message: Message, state: FSMContext):
@@ -303,22 +460,13 @@ async def _show_results(message: Message, state: FSMContext):
     topic = data.get("topic", "")
     total = data.get("question_count", 0)
     correct = data.get("correct_count", 0)
-    answers = data.get("answers", [])
+    answers = _expand_answers(data.get("questions", []), data.get("answers", []))
     answer_times = data.get("answer_times", [])
     user_id = data.get("user_id")
 
     actual_total = len(answers) or total
     percent = round(correct / actual_total * 100) if actual_total > 0 else 0
 
-    # Save test session to DB
-    difficulty = data.get("level")
-    try:
-        from database.crud import save_test_session
-        if user_id:
-            await save_test_session(user_id, language, topic, actual_total, correct, percent, answers, difficulty=difficulty)
-    except Exception as e:
-        logger.error("Failed to save test session for user_id=%s: %s", user_id, e)
-
     # Gamification
     theme_key = "neutral"
     xp_earned = 0
@@ -326,15 +474,29 @@ async def _show_results(message: Message, state: FSMContext):
     level = 1
     xp_total = 0
     new_badges = []
+    save_task = None
 
     if user_id:
         try:
             from database.crud import (
                 ensure_user_stats, update_user_stats, get_user_badges,
-                award_badge, get_distinct_languages, get_distinct_topics,
+                award_badges, get_distinct_languages, get_distinct_topics,
                 get_stats_summary,
             )
 
+            # Счётчики для значков читаются до сохранения сессии, а сама сессия
+            # добавляется к ним при проверке: результат не ждёт записи в БД.
+            # Сохранение идёт в фоне, параллельно с обновлением статистики
+            existing, summary, langs, topics_count = await asyncio.gather(
+                get_user_badges(user_id),
+                get_stats_summary(user_id),
+                get_distinct_languages(user_id, include=language),
+                get_distinct_topics(user_id, include=topic),
+            )
+            save_task = run_in_background(_persist_session(
+                user_id, language, topic, actual_total, correct, percent, answers, data.get("level"),
+            ))
+
             stats = await ensure_user_stats(user_id)
             theme_key = stats.get("theme") or "neutral"
 
@@ -362,26 +524,21 @@ async def _show_results(message: Message, state: FSMContext):
                 streak_days, longest, today_str, level,
             )
 
-            # Check badges
-            existing = set(await get_user_badges(user_id))
-            summary = await get_stats_summary(user_id)
-            langs = await get_distinct_languages(user_id)
-            topics_count = await get_distinct_topics(user_id)
             all_fast = bool(answer_times) and all(t < 10.0 for t in answer_times)
 
             new_badges = check_badges(
-                total_tests=summary.get("total_tests", 0),
+                total_tests=summary.get("total_tests", 0) + 1,
                 current_streak=streak_days,
                 level=level,
                 percent=percent,
                 languages_used=langs,
                 topics_used=topics_count,
                 all_fast=all_fast,
-                existing_badges=existing,
+                existing_badges=set(existing),
             )
 
-            for badge_key in new_badges:
-                await award_badge(user_id, badge_key)
+            # Все новые значки — одним executemany и одним commit
+            await award_badges(user_id, new_badges)
 
         except Exception as e:
             logger.error("Gamification error for user_id=%s: %s", user_id, e)
@@ -403,3 +560,11 @@ async def _show_results(message: Message, state: FSMContext):
 
     await state.clear()
     await message.answer(text, reply_markup=quiz_home_keyboard())
+
+    # Сессия сохраняется и при сбое геймификации; ждём запись уже после ответа
+    if user_id and save_task is None:
+        save_task = run_in_background(_persist_session(
+            user_id, language, topic, actual_total, correct, percent, answers, data.get("level"),
+        ))
+    if save_task is not None:
+        await save_task
@@ -3,8 +3,10 @@ from aiogram import Router, F
 from aiogram.types import CallbackQuery
 from aiogram.fsm.context import FSMContext
 
+from config import SUBJECT_FLAGS, DEFAULT_SUBJECT_FLAG
 from states.quiz_states import QuizFlow
 from keyboards.main_menu import quiz_home_keyboard
+from utils.background import run_in_background
 
 router = Router()
 
@@ -19,16 +21,7 @@ async def count_selected(callback: CallbackQuery, state: FSMContext):
     topic = data["topic"]
     level = data.get("level", "A2")
 
-    lang_flag_map = {
-        "English": "🇬🇧",
-        "Spanish": "🇪🇸",
-        "French": "🇫🇷",
-        "German": "🇩🇪",
-        "Mathematics": "📐",
-        "History": "🏛",
-        "Biology": "🧬",
-    }
-    lang_flag = lang_flag_map.get(language, "📘")
+    lang_flag = SUBJECT_FLAGS.get(language, DEFAULT_SUBJECT_FLAG)
 
     await state.set_state(QuizFlow.generating_test)
     await callback.message.edit_text(
@@ -39,7 +32,7 @@ async def count_selected(callback: CallbackQuery, state: FSMContext):
         f"❓ Вопросов: {count}\n\n"
         f"Подожди немного, это займёт 10-20 секунд..."
     )
-    await callback.answer()
+    run_in_background(callback.answer())
 
     from services.test_generator import generate_test
     from handlers.quiz import start_quiz
@@ -1,7 +1,8 @@
 """Обработчик команды /raspisanie — расписание уроков из МЭШ."""
-import html
+import asyncio
 import logging
 from datetime import date, timedelta
+from functools import cache
 from typing import List, Optional, Tuple
 
 from aiogram import Router, F
@@ -20,34 +21,89 @@ logger = logging.getLogger(__name__)
 router = Router()
 
 # Названия дней недели на русском
-_WEEKDAY_NAMES = [
+_WEEKDAY_NAMES = (
     "понедельник", "вторник", "среда", "четверг",
-    "пятница", "суббота", "воскресенье"
-]
+    "пятница", "суббота", "воскресенье",
+)
 
 # Названия месяцев на русском (родительный падеж)
-_MONTH_NAMES = [
-    "", "января", "февраля", "марта", "апреля", "мая", "июня",
-    "июля", "августа", "сентября", "октября", "ноября", "декабря"
-]
+_MONTH_NAMES = (
+    "января", "февраля", "марта", "апреля", "мая", "июня",
+    "июля", "августа", "сентября", "октября", "ноября", "декабря",
+)
+
+# Периоды, которые можно запросить из callback_data
+_PERIODS = frozenset(("today", "tomorrow", "week"))
+
+# Смещения Пн-Пт от понедельника
+_WORKDAY_OFFSETS = tuple(timedelta(days=i) for i in range(5))
+
+# Подписи строки деталей урока
+_ROOM_LABEL = "\U0001f4cd Каб. "
+_TEACHER_LABEL = "\U0001f468\u200d\U0001f3eb "
+
+# Таблица HTML-экранирования (та же, что у html.escape с quote=True)
+_ESCAPE_TABLE = str.maketrans({
+    "&": "&amp;",
+    "<": "&lt;",
+    ">": "&gt;",
+    '"': "&quot;",
+    "'": "&#x27;",
+})
 
 
 # ============================================================================
 # ВСПОМОГАТЕЛЬНЫЕ ФУНКЦИИ
 # ============================================================================
 
-def _get_week_dates(today: date) -> List[date]:
+def _get_week_dates(today: date) -> Tuple[date, ...]:
     """Возвращает даты Пн-Пт текущей недели."""
     monday = today - timedelta(days=today.weekday())
-    return [monday + timedelta(days=i) for i in range(5)]
+    return tuple(monday + offset for offset in _WORKDAY_OFFSETS)
+
+
+def _esc(text: Optional[str]) -> str:
+    """Экранирует данные от API для parse_mode=HTML за один проход."""
+    if not text:
+        return ""
+    # Быстрый путь: в названиях предметов/кабинетов спецсимволов почти не бывает,
+    # а проверки `in` идут в C и не создают новую строку
+    if (
+        "&" not in text and "<" not in text and ">" not in text
+        and '"' not in text and "'" not in text
+    ):
+        return text
+    return text.translate(_ESCAPE_TABLE)
 
 
 def _format_day_header(day_date: date) -> str:
     """Форматирует заголовок дня: '27 февраля (четверг)'."""
-    day_num = day_date.day
-    month_name = _MONTH_NAMES[day_date.month]
-    weekday_name = _WEEKDAY_NAMES[day_date.weekday()]
-    return f"{day_num} {month_name} ({weekday_name})"
+    return (
+        f"{day_date.day} {_MONTH_NAMES[day_date.month - 1]} "
+        f"({_WEEKDAY_NAMES[day_date.weekday()]})"
+    )
+
+
+def _format_lesson(lesson: Lesson) -> str:
+    """Форматирует один урок: строка с временем и предметом + строка с кабинетом/учителем."""
+    # Основная строка: номер, время, предмет (экранируем данные от API)
+    text = (
+        f"{lesson.number}. "
+        f"{_esc(lesson.time_start)}\u2013{_esc(lesson.time_end)} "
+        f"\u2014 {_esc(lesson.subject)}"
+    )
+
+    # Дополнительная строка: кабинет и учитель
+    if lesson.room and lesson.teacher:
+        return (
+            f"{text}\n   {_ROOM_LABEL}{_esc(lesson.room)}"
+            f" | {_TEACHER_LABEL}{_esc(lesson.teacher)}"
+        )
+    if lesson.room:
+        return f"{text}\n   {_ROOM_LABEL}{_esc(lesson.room)}"
+    if lesson.teacher:
+        return f"{text}\n   {_TEACHER_LABEL}{_esc(lesson.teacher)}"
+    return text
 
 
 def _format_day_schedule(day_date: date, lessons: List[Lesson]) -> str:
@@ -57,52 +113,32 @@ def _format_day_schedule(day_date: date, lessons: List[Lesson]) -> str:
     if not lessons:
         return f"<b>\U0001f4da Расписание на {header}</b>\n\n\U0001f4ed На этот день уроков нет"
 
-    lines = [f"<b>\U0001f4da Расписание на {header}</b>\n"]
-
-    for lesson in lessons:
-        # Основная строка: номер, время, предмет (экранируем данные от API)
-        line = (
-            f"{lesson.number}. "
-            f"{html.escape(lesson.time_start)}\u2013{html.escape(lesson.time_end)} "
-            f"\u2014 {html.escape(lesson.subject)}"
-        )
-        lines.append(line)
-
-        # Дополнительная строка: кабинет и учитель
-        details = []
-        if lesson.room:
-            details.append(f"\U0001f4cd Каб. {html.escape(lesson.room)}")
-        if lesson.teacher:
-            details.append(f"\U0001f468\u200d\U0001f3eb {html.escape(lesson.teacher)}")
-
-        if details:
-            lines.append(f"   {' | '.join(details)}")
-
-        # Пустая строка между уроками
-        lines.append("")
+    blocks = [f"<b>\U0001f4da Расписание на {header}</b>"]
+    blocks.extend(_format_lesson(lesson) for lesson in lessons)
 
-    return "\n".join(lines).rstrip()
+    # Пустая строка между заголовком и уроками, а также между уроками
+    return "\n\n".join(blocks)
 
 
 def _format_week_schedule(results: List[Tuple[date, Optional[List[Lesson]]]]) -> Optional[str]:
     """Форматирует расписание на неделю."""
-    parts = []
+    blocks = []
     has_any_data = False
 
     for day_date, lessons in results:
         if lessons is None:
             # Ошибка загрузки этого дня
             header = _format_day_header(day_date)
-            parts.append(f"<b>\u26a0\ufe0f {header}</b>\n   Не удалось загрузить\n")
+            blocks.append(f"<b>\u26a0\ufe0f {header}</b>\n   Не удалось загрузить")
         else:
             has_any_data = True
-            parts.append(_format_day_schedule(day_date, lessons))
-            parts.append("")  # Разделитель между днями
+            blocks.append(_format_day_schedule(day_date, lessons))
 
     if not has_any_data:
         return None  # Все дни упали — вернём None для общей ошибки
 
-    return "\n".join(parts).rstrip()
+    # Дни разделяются пустой строкой
+    return "\n\n".join(blocks)
 
 
 def _get_period_keyboard(student_id: int) -> InlineKeyboardMarkup:
@@ -159,8 +195,9 @@ def _get_child_keyboard(children: List[dict]) -> InlineKeyboardMarkup:
     return InlineKeyboardMarkup(inline_keyboard=buttons)
 
 
+@cache
 def _home_only_keyboard() -> InlineKeyboardMarkup:
-    """Клавиатура с одной кнопкой «Главное меню»."""
+    """Клавиатура с одной кнопкой «Главное меню» (статична — строится один раз)."""
     return InlineKeyboardMarkup(inline_keyboard=[[home_button()]])
 
 
@@ -172,19 +209,21 @@ def _parse_callback_data(data: str) -> Optional[tuple]:
         Tuple (action, student_id, extra) или None при ошибке.
         extra может быть None если не указан.
     """
-    try:
-        parts = data.split(":")
-        if len(parts) < 3 or parts[0] != "sched":
-            return None
+    if not data.startswith("sched:"):
+        return None
 
-        action = parts[1]
-        student_id = int(parts[2])
-        extra = parts[3] if len(parts) > 3 else None
+    parts = data.split(":", 3)  # sched, action, student_id[, extra]
+    if len(parts) < 3:
+        return None
 
-        return (action, student_id, extra)
-    except (ValueError, IndexError):
+    raw_id = parts[2]
+    digits = raw_id[1:] if raw_id.startswith("-") else raw_id
+    if not digits.isdecimal():
         return None
 
+    extra = parts[3] if len(parts) > 3 else None
+    return (parts[1], int(raw_id), extra)
+
 
 async def _fetch_week_schedule(
     client: MeshClient, student_id: int, today: date, token: str,
@@ -192,7 +231,7 @@ async def _fetch_week_schedule(
 ) -> Optional[str]:
     """
     Получает расписание на неделю (Пн-Пт).
-    Каждый день в отдельном try/except.
+    Дни запрашиваются параллельно, ошибка одного дня не роняет остальные.
     AuthenticationError пробрасывается наверх — не маскируется.
 
     Returns:
@@ -202,23 +241,31 @@ async def _fetch_week_schedule(
         AuthenticationError: Проблема с авторизацией (пробрасывается сразу)
     """
     week_dates = _get_week_dates(today)
-    results: List[Tuple[date, Optional[List[Lesson]]]] = []
-
-    for day_date in week_dates:
-        try:
-            lessons = await client.get_schedule(
+    raw_results = await asyncio.gather(
+        *(
+            client.get_schedule(
                 student_id, day_date.isoformat(), token,
                 person_id=person_id, mes_role=mes_role,
             )
-            results.append((day_date, lessons))
-        except AuthenticationError:
-            raise  # Не маскируем — пусть вызывающий покажет "перерегистрируйтесь"
-        except MeshAPIError as e:
+            for day_date in week_dates
+        ),
+        return_exceptions=True,
+    )
+
+    results: List[Tuple[date, Optional[List[Lesson]]]] = []
+    for day_date, result in zip(week_dates, raw_results):
+        if isinstance(result, AuthenticationError):
+            raise result  # Не маскируем — пусть вызывающий покажет "перерегистрируйтесь"
+        if isinstance(result, MeshAPIError):
             logger.error(
                 "Ошибка загрузки расписания на %s для student_id=%d: %s",
-                day_date.isoformat(), student_id, e
+                day_date.isoformat(), student_id, result
             )
             results.append((day_date, None))  # Пропускаем этот день
+        elif isinstance(result, BaseException):
+            raise result
+        else:
+            results.append((day_date, result))
 
     return _format_week_schedule(results)
 
@@ -239,8 +286,8 @@ async def _get_schedule_text(
     """
     today = date.today()
 
-    client = MeshClient()
-    try:
+    # Один клиент на весь запрос — все дни недели идут через него
+    async with MeshClient() as client:
         if period == "today":
             lessons = await client.get_schedule(
                 student_id, today.isoformat(), token,
@@ -270,8 +317,6 @@ async def _get_schedule_text(
                 person_id=person_id, mes_role=mes_role,
             )
             text = _format_day_schedule(today, lessons)
-    finally:
-        await client.close()
 
     keyboard = _get_period_keyboard(student_id)
     return text, keyboard
@@ -507,7 +552,7 @@ async def cb_switch_period(callback: CallbackQuery):
 
     _, student_id, period = parsed
 
-    if period not in ("today", "tomorrow", "week"):
+    if period not in _PERIODS:
         logger.warning("Неизвестный период в callback_data: %s", callback.data)
         return
 
@@ -526,7 +571,7 @@ async def cb_retry(callback: CallbackQuery):
 
     _, student_id, period = parsed
 
-    if period not in ("today", "tomorrow", "week"):
+    if period not in _PERIODS:
         logger.warning("Неизвестный период в callback_data: %s", callback.data)
         return
 
@@ -14,6 +14,7 @@ from database.crud import (
 )
 from keyboards.main_menu import home_button
 from services.gamification import THEMES
+from utils.background import run_in_background
 
 logger = logging.getLogger(__name__)
 router = Router()
@@ -84,7 +85,7 @@ async def cmd_settings(message: Message):
 @router.callback_query(F.data == "menu:settings")
 async def cb_menu_settings(callback: CallbackQuery):
     """Кнопка 'Настройки' из главного меню."""
-    await callback.answer()
+    run_in_background(callback.answer())
     role = await get_user_role(callback.from_user.id) or "student"
     await _show_settings(callback.from_user.id, role, edit_message=callback.message)
 
@@ -92,7 +93,7 @@ async def cb_menu_settings(callback: CallbackQuery):
 @router.callback_query(F.data.startswith("settings:toggle:"))
 async def cb_toggle_notification(callback: CallbackQuery):
     """Переключить уведомление вкл/выкл."""
-    await callback.answer()
+    run_in_background(callback.answer())
     user_id = callback.from_user.id
 
     parts = callback.data.split(":")
@@ -144,7 +145,7 @@ def _theme_keyboard(current_theme: str) -> InlineKeyboardMarkup:
 @router.callback_query(F.data == "settings:theme")
 async def cb_choose_theme(callback: CallbackQuery):
     """Show theme selection menu."""
-    await callback.answer()
+    run_in_background(callback.answer())
     user_id = callback.from_user.id
     current = await get_user_theme(user_id)
     current_name = THEMES.get(current, THEMES["neutral"])["display_name"]
@@ -13,6 +13,7 @@ from config import settings
 from database.crud import user_exists, delete_user, get_user_role, get_user, ensure_quiz_user, set_user_access
 from states.registration import RegistrationStates
 from keyboards.main_menu import full_menu_keyboard, student_menu_keyboard, home_button
+from utils.background import run_in_background
 
 logger = logging.getLogger(__name__)
 router = Router()
@@ -404,7 +405,7 @@ async def go_home(callback: CallbackQuery, state: FSMContext):
         )
     else:
         await callback.message.edit_text("Главное меню:", reply_markup=full_menu_keyboard())
-    await callback.answer()
+    run_in_background(callback.answer())
 
 
 @router.callback_query(F.data == "reregister")
@@ -429,6 +430,6 @@ async def cb_reregister(callback: CallbackQuery, state: FSMContext):
         "Введите ваш логин от dnevnik.mos.ru:"
     )
     await state.set_state(RegistrationStates.waiting_for_mesh_login)
-    await callback.answer()
+    run_in_background(callback.answer())
 
 
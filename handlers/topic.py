@@ -1,4 +1,6 @@
 """Topic selection handler for quiz."""
+from collections.abc import Mapping
+
 from aiogram import Router, F
 from aiogram.types import CallbackQuery, Message
 from aiogram.fsm.context import FSMContext
@@ -6,6 +8,7 @@ from aiogram.fsm.context import FSMContext
 from states.quiz_states import QuizFlow
 from config import settings
 from keyboards.quiz_kb import question_count_keyboard, topic_keyboard
+from utils.background import run_in_background
 
 router = Router()
 
@@ -29,15 +32,15 @@ async def topic_selected(callback: CallbackQuery, state: FSMContext):
         await callback.message.edit_text(
             "✏️ Напиши тему, по которой хочешь пройти тест:"
         )
-        await callback.answer()
+        run_in_background(callback.answer())
         return
 
     data = await state.get_data()
     language = data["language"]
     level = data.get("level", "A2")
     lang_topics = settings.TOPICS.get(language, {})
-    if isinstance(lang_topics, dict):
-        topics = lang_topics.get(level, [])
+    if isinstance(lang_topics, Mapping):
+        topics = lang_topics.get(level, ())
     else:
         topics = lang_topics
     topic_index = int(value)
@@ -49,7 +52,7 @@ async def topic_selected(callback: CallbackQuery, state: FSMContext):
         f"📝 Тема: {topic}\n\nСколько вопросов в тесте?",
         reply_markup=question_count_keyboard(),
     )
-    await callback.answer()
+    run_in_background(callback.answer())
 
 
 @router.callback_query(F.data == "back_to_topic")
@@ -65,7 +68,7 @@ async def back_to_topic(callback: CallbackQuery, state: FSMContext):
         f"Выбери тему по {lang_name}:",
         reply_markup=topic_keyboard(language, level),
     )
-    await callback.answer()
+    run_in_background(callback.answer())
 
 
 @router.message(QuizFlow.entering_custom_topic)
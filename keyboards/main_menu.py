@@ -1,4 +1,9 @@
-"""Role-based main menu keyboards."""
+"""Role-based main menu keyboards.
+
+Статические клавиатуры строятся один раз (functools.cache) — возвращаемые объекты общие, не изменяйте их.
+"""
+from functools import cache
+
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
 
 
@@ -12,6 +17,7 @@ def back_button(callback_data: str) -> InlineKeyboardButton:
     return InlineKeyboardButton(text="◀️ Назад", callback_data=callback_data)
 
 
+@cache
 def full_menu_keyboard() -> InlineKeyboardMarkup:
     """Full menu for admin and parent (all features)."""
     return InlineKeyboardMarkup(inline_keyboard=[
@@ -26,6 +32,7 @@ def full_menu_keyboard() -> InlineKeyboardMarkup:
     ])
 
 
+@cache
 def student_menu_keyboard() -> InlineKeyboardMarkup:
     """Menu for students (schedule, homework, tests — no grades)."""
     return InlineKeyboardMarkup(inline_keyboard=[
@@ -40,6 +47,7 @@ def student_menu_keyboard() -> InlineKeyboardMarkup:
     ])
 
 
+@cache
 def quiz_home_keyboard() -> InlineKeyboardMarkup:
     """Home menu for quiz section (back to start)."""
     return InlineKeyboardMarkup(inline_keyboard=[
@@ -51,6 +59,7 @@ def quiz_home_keyboard() -> InlineKeyboardMarkup:
     ])
 
 
+@cache
 def social_menu_keyboard() -> InlineKeyboardMarkup:
     """Menu for competitions and social features."""
     return InlineKeyboardMarkup(inline_keyboard=[
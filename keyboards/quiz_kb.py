@@ -1,11 +1,21 @@
 """Quiz inline keyboards."""
+from collections.abc import Mapping
+from functools import cache, lru_cache
+
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
 
 from config import settings
 from keyboards.main_menu import home_button
 from services.level_adapter import AVAILABLE_LEVELS
 
+# Неизменяемые кнопки, повторяющиеся в нескольких клавиатурах, создаются один раз:
+# валидация pydantic-модели aiogram — основная цена построения разметки
+_CANCEL_BUTTON = InlineKeyboardButton(text="❌ Отменить тест", callback_data="cancel_quiz")
+_BACK_TO_LANGUAGE_BUTTON = InlineKeyboardButton(text="🔙 Назад к выбору языка", callback_data="start_test")
+_OPTION_LABELS = ("A", "B", "C", "D")
+
 
+@cache
 def language_keyboard() -> InlineKeyboardMarkup:
     return InlineKeyboardMarkup(inline_keyboard=[
         [InlineKeyboardButton(text="🇬🇧 English", callback_data="lang:English")],
@@ -19,6 +29,8 @@ def language_keyboard() -> InlineKeyboardMarkup:
     ])
 
 
+# Язык и уровень приходят из callback_data, поэтому кэш ограничен по размеру
+@lru_cache(maxsize=64)
 def level_keyboard(language: str) -> InlineKeyboardMarkup:
     """Keyboard for manual CEFR level selection (parent/admin)."""
     levels = AVAILABLE_LEVELS.get(language, ["A2"])
@@ -30,26 +42,28 @@ def level_keyboard(language: str) -> InlineKeyboardMarkup:
             text=f"{lvl} — {short_desc}",
             callback_data=f"level:{lvl}",
         )])
-    buttons.append([InlineKeyboardButton(text="🔙 Назад к выбору языка", callback_data="start_test")])
+    buttons.append([_BACK_TO_LANGUAGE_BUTTON])
     return InlineKeyboardMarkup(inline_keyboard=buttons)
 
 
+@lru_cache(maxsize=64)
 def topic_keyboard(language: str, level: str | None = None) -> InlineKeyboardMarkup:
     lang_topics = settings.TOPICS.get(language, {})
-    if isinstance(lang_topics, dict) and level:
-        topics = lang_topics.get(level, [])
-    elif isinstance(lang_topics, list):
+    if isinstance(lang_topics, Mapping) and level:
+        topics = lang_topics.get(level, ())
+    elif isinstance(lang_topics, tuple):
         topics = lang_topics
     else:
-        topics = []
+        topics = ()
     buttons = []
     for i, topic in enumerate(topics):
         buttons.append([InlineKeyboardButton(text=topic, callback_data=f"topic:{i}")])
     buttons.append([InlineKeyboardButton(text="✏️ Другое (своя тема)", callback_data="topic:custom")])
-    buttons.append([InlineKeyboardButton(text="🔙 Назад к выбору языка", callback_data="start_test")])
+    buttons.append([_BACK_TO_LANGUAGE_BUTTON])
     return InlineKeyboardMarkup(inline_keyboard=buttons)
 
 
+@cache
 def question_count_keyboard() -> InlineKeyboardMarkup:
     buttons = []
     for count in settings.QUESTION_COUNTS:
@@ -62,30 +76,37 @@ def question_count_keyboard() -> InlineKeyboardMarkup:
 
 
 def multiple_choice_keyboard(options: list[str]) -> InlineKeyboardMarkup:
-    labels = ["A", "B", "C", "D"]
+    return _multiple_choice_keyboard(tuple(options[:4]))
+
+
+@lru_cache(maxsize=512)
+def _multiple_choice_keyboard(options: tuple[str, ...]) -> InlineKeyboardMarkup:
+    # Одинаковые наборы вариантов (частые у LLM и шаблонов) получают одну разметку
     buttons = []
-    for i, option in enumerate(options[:4]):
-        label = labels[i] if i < len(labels) else str(i + 1)
+    for i, option in enumerate(options):
+        label = _OPTION_LABELS[i] if i < len(_OPTION_LABELS) else str(i + 1)
         buttons.append([InlineKeyboardButton(
             text=f"{label}) {option}",
             callback_data=f"ans:{option}",
         )])
-    buttons.append([InlineKeyboardButton(text="❌ Отменить тест", callback_data="cancel_quiz")])
+    buttons.append([_CANCEL_BUTTON])
     return InlineKeyboardMarkup(inline_keyboard=buttons)
 
 
+@cache
 def true_false_keyboard() -> InlineKeyboardMarkup:
     return InlineKeyboardMarkup(inline_keyboard=[
         [
             InlineKeyboardButton(text="✅ True", callback_data="ans:True"),
             InlineKeyboardButton(text="❌ False", callback_data="ans:False"),
         ],
-        [InlineKeyboardButton(text="❌ Отменить тест", callback_data="cancel_quiz")],
+        [_CANCEL_BUTTON],
     ])
 
 
+@cache
 def cancel_keyboard() -> InlineKeyboardMarkup:
     """Keyboard shown during text-input questions."""
     return InlineKeyboardMarkup(inline_keyboard=[
-        [InlineKeyboardButton(text="❌ Отменить тест", callback_data="cancel_quiz")],
+        [_CANCEL_BUTTON],
     ])
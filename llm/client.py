@@ -1,4 +1,5 @@
 """OpenAI-compatible LLM client with bridge -> direct fallback."""
+import asyncio
 import io
 import logging
 from typing import Optional
@@ -11,6 +12,16 @@ logger = logging.getLogger(__name__)
 _last_llm_error: str | None = None
 _last_stt_error: str | None = None
 
+# Bounds in-flight chat completions so bursts queue here instead of overloading LM Studio.
+_llm_semaphore = asyncio.Semaphore(max(1, settings.LLM_MAX_PARALLEL))
+
+# One client per endpoint: its httpx pool keeps connections alive between requests,
+# so only the first request to an endpoint pays for TCP/TLS setup.
+_clients: dict[tuple[str, str], AsyncOpenAI] = {}
+
+# A warm-up request only needs to open the connection, not wait for a busy model.
+PREWARM_TIMEOUT_SECONDS = 10.0
+
 
 def _normalize_base_url(url: Optional[str]) -> Optional[str]:
     if not url:
@@ -44,6 +55,35 @@ def _iter_llm_targets() -> list[tuple[str, str, str]]:
     return targets
 
 
+def _get_client(base_url: str, api_key: str) -> AsyncOpenAI:
+    """Return the shared client for an endpoint, creating it on first use."""
+    client = _clients.get((base_url, api_key))
+    if client is None:
+        client = AsyncOpenAI(
+            base_url=base_url,
+            api_key=api_key,
+            timeout=settings.LLM_REQUEST_TIMEOUT,
+        )
+        _clients[(base_url, api_key)] = client
+    return client
+
+
+async def prewarm() -> None:
+    """
+    Open keep-alive connections to the configured endpoints at startup.
+
+    Lists models on each target so the first quiz does not pay for DNS, TCP and
+    TLS setup. Failures are only logged: the endpoint may come up later.
+    """
+    for base_url, api_key, label in _iter_llm_targets():
+        try:
+            client = _get_client(base_url, api_key)
+            await client.with_options(timeout=PREWARM_TIMEOUT_SECONDS, max_retries=0).models.list()
+            logger.info("LLM %s endpoint warmed up (url=%s)", label, base_url)
+        except Exception as e:
+            logger.info("LLM %s endpoint warm-up failed (url=%s): %s", label, base_url, e)
+
+
 def _build_audio_file_object(data: bytes, filename: str) -> io.BytesIO:
     file_obj = io.BytesIO(data)
     file_obj.name = filename
@@ -56,23 +96,33 @@ async def _request_chat_completion(
     prompt: str,
     temperature: float,
     max_tokens: int,
+    system: str | None = None,
 ) -> str:
-    client = AsyncOpenAI(
-        base_url=base_url,
-        api_key=api_key,
-        timeout=settings.LLM_REQUEST_TIMEOUT,
-    )
+    client = _get_client(base_url, api_key)
+    messages = [{"role": "user", "content": prompt}]
+    if system:
+        messages.insert(0, {"role": "system", "content": system})
     response = await client.chat.completions.create(
         model=settings.LLM_MODEL,
-        messages=[{"role": "user", "content": prompt}],
+        messages=messages,
         temperature=temperature,
         max_tokens=max_tokens,
     )
     return response.choices[0].message.content or ""
 
 
-async def chat_completion(prompt: str, temperature: float = 0.7, max_tokens: int = 4096) -> str | None:
-    """Send prompt to configured LLM targets. Bridge is attempted before direct endpoint."""
+async def chat_completion(
+    prompt: str,
+    temperature: float = 0.7,
+    max_tokens: int = 4096,
+    system: str | None = None,
+) -> str | None:
+    """
+    Send prompt to configured LLM targets. Bridge is attempted before direct endpoint.
+
+    A static ``system`` message goes first, so OpenAI and LM Studio can reuse
+    its cached prefix across requests; only the ``prompt`` part is new.
+    """
     global _last_llm_error
     targets = _iter_llm_targets()
     if not targets:
@@ -83,13 +133,15 @@ async def chat_completion(prompt: str, temperature: float = 0.7, max_tokens: int
     errors: list[str] = []
     for base_url, api_key, label in targets:
         try:
-            result = await _request_chat_completion(
-                base_url=base_url,
-                api_key=api_key,
-                prompt=prompt,
-                temperature=temperature,
-                max_tokens=max_tokens,
-            )
+            async with _llm_semaphore:
+                result = await _request_chat_completion(
+                    base_url=base_url,
+                    api_key=api_key,
+                    prompt=prompt,
+                    temperature=temperature,
+                    max_tokens=max_tokens,
+                    system=system,
+                )
             if result:
                 _last_llm_error = None
                 return result
@@ -124,11 +176,7 @@ async def _request_audio_transcription(
     audio_bytes: bytes,
     filename: str,
 ) -> str:
-    client = AsyncOpenAI(
-        base_url=base_url,
-        api_key=api_key,
-        timeout=settings.LLM_REQUEST_TIMEOUT,
-    )
+    client = _get_client(base_url, api_key)
     transcription = await client.audio.transcriptions.create(
         model=settings.STT_MODEL,
         file=_build_audio_file_object(audio_bytes, filename),
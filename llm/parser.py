@@ -1,10 +1,18 @@
 """Parse LLM JSON responses into question dicts."""
-import json
 import logging
 import re
 
+import orjson
+
 logger = logging.getLogger(__name__)
 
+_CODEBLOCK_RE = re.compile(r"```(?:json)?\s*(\[.+?])\s*```", re.DOTALL)
+_ARRAY_RE = re.compile(r"(\[\s*\{.+}\s*])", re.DOTALL)
+_LETTER_PREFIX_RE = re.compile(r"^[A-Da-d][).:\s]+")
+
+# Option letter -> index for letter-based correct answers
+LETTER_INDEX = {"A": 0, "B": 1, "C": 2, "D": 3, "a": 0, "b": 1, "c": 2, "d": 3}
+
 REQUIRED_FIELDS = {
     "multiple_choice": {"question", "options", "correct", "explanation"},
     "fill_blank": {"question", "correct", "explanation"},
@@ -25,13 +33,13 @@ def parse_questions(raw_text: str) -> list[dict] | None:
 
     # Try extracting from markdown code block
     if questions is None:
-        match = re.search(r"```(?:json)?\s*(\[.+?])\s*```", raw_text, re.DOTALL)
+        match = _CODEBLOCK_RE.search(raw_text)
         if match:
             questions = _try_parse_json(match.group(1))
 
     # Try finding array in the text
     if questions is None:
-        match = re.search(r"(\[\s*\{.+}\s*])", raw_text, re.DOTALL)
+        match = _ARRAY_RE.search(raw_text)
         if match:
             questions = _try_parse_json(match.group(1))
 
@@ -39,25 +47,33 @@ def parse_questions(raw_text: str) -> list[dict] | None:
         logger.error("Failed to parse LLM response as JSON")
         return None
 
-    # Normalize and validate each question
+    # Normalize and validate each question in a single pass
     valid = []
+    append = valid.append
     for q in questions:
-        if q.get("type") == "multiple_choice":
-            q = _normalize_multiple_choice(q)
-        if _validate_question(q):
-            valid.append(q)
-        else:
-            logger.warning("Skipping invalid question: %s", q)
+        q_type = q.get("type")
+        required = REQUIRED_FIELDS.get(q_type)
+        if required is not None:
+            if q_type == "multiple_choice":
+                q = _normalize_multiple_choice(q)
+            for field in required:
+                if not q.get(field):
+                    break
+            else:
+                append(q)
+                continue
+        logger.warning("Skipping invalid question: %s", q)
 
     return valid if valid else None
 
 
 def _try_parse_json(text: str) -> list[dict] | None:
     try:
-        data = json.loads(text)
+        data = orjson.loads(text)
         if isinstance(data, list):
             return data
-    except (json.JSONDecodeError, TypeError) as e:
+    except (ValueError, TypeError) as e:
+        # orjson.JSONDecodeError subclasses ValueError.
         logger.debug("LLM JSON parse failed: %s", e)
     return None
 
@@ -65,28 +81,17 @@ def _try_parse_json(text: str) -> list[dict] | None:
 def _normalize_multiple_choice(q: dict) -> dict:
     """Strip letter prefixes from options and resolve letter-based correct answers."""
     options = q.get("options", [])
-    letter_re = re.compile(r"^[A-Da-d][).:\s]+")
-
-    cleaned = [letter_re.sub("", opt).strip() for opt in options]
+    cleaned = [_LETTER_PREFIX_RE.sub("", opt).strip() for opt in options]
 
     correct = q.get("correct", "")
 
-    if re.match(r"^[A-Da-d]$", correct.strip()):
-        idx = ord(correct.strip().upper()) - ord("A")
-        if 0 <= idx < len(cleaned):
-            correct = cleaned[idx]
+    idx = LETTER_INDEX.get(correct.strip())
+    if idx is not None and idx < len(cleaned):
+        correct = cleaned[idx]
 
-    correct = letter_re.sub("", correct).strip()
+    correct = _LETTER_PREFIX_RE.sub("", correct).strip()
 
     q = dict(q)
     q["options"] = cleaned
     q["correct"] = correct
     return q
-
-
-def _validate_question(q: dict) -> bool:
-    q_type = q.get("type")
-    if q_type not in REQUIRED_FIELDS:
-        return False
-    required = REQUIRED_FIELDS[q_type]
-    return all(q.get(field) for field in required)
@@ -1,10 +1,10 @@
 """Prompt templates for test generation."""
+from functools import lru_cache
+
 from config import settings
 
 
-def _examples_for_language(language: str) -> str:
-    if language in {"English", "French", "German"}:
-        return """For multiple_choice:
+_EXAMPLES_LANGUAGE = """For multiple_choice:
 {"type": "multiple_choice", "question": "Choose the correct form: She ___ to school every day.", "options": ["go", "goes", "going", "gone"], "correct": "goes", "explanation": "..."}
 IMPORTANT: "options" must contain answer text (words/phrases), not A/B/C/D labels.
 
@@ -17,8 +17,7 @@ For translation:
 For true_false:
 {"type": "true_false", "question": "In Present Simple we add -s for 'they'.", "correct": "False", "explanation": "..."}"""
 
-    if language == "Spanish":
-        return """For multiple_choice:
+_EXAMPLES_SPANISH = """For multiple_choice:
 {"type": "multiple_choice", "question": "Elige la forma correcta: Yo ___ en la escuela.", "options": ["estudio", "estudias", "estudia", "estudiamos"], "correct": "estudio", "explanation": "..."}
 IMPORTANT: "options" must contain answer text (words/phrases), not A/B/C/D labels.
 
@@ -31,8 +30,7 @@ For translation:
 For true_false:
 {"type": "true_false", "question": "In Spanish, nouns have gender (masculine/feminine).", "correct": "True", "explanation": "..."}"""
 
-    if language == "Mathematics":
-        return """For multiple_choice:
+_EXAMPLES_MATHEMATICS = """For multiple_choice:
 {"type": "multiple_choice", "question": "Чему равен периметр квадрата со стороной 6 см?", "options": ["12 см", "18 см", "24 см", "36 см"], "correct": "24 см", "explanation": "..."}
 IMPORTANT: "options" must contain answer text (numbers/words), not A/B/C/D labels.
 
@@ -42,8 +40,7 @@ For fill_blank:
 For true_false:
 {"type": "true_false", "question": "Сумма углов треугольника равна 180 градусам.", "correct": "True", "explanation": "..."}"""
 
-    if language == "History":
-        return """For multiple_choice:
+_EXAMPLES_HISTORY = """For multiple_choice:
 {"type": "multiple_choice", "question": "В каком году началась Отечественная война 1812 года?", "options": ["1805", "1812", "1825", "1914"], "correct": "1812", "explanation": "..."}
 IMPORTANT: "options" must contain answer text, not A/B/C/D labels.
 
@@ -53,8 +50,7 @@ For fill_blank:
 For true_false:
 {"type": "true_false", "question": "Крещение Руси произошло раньше монгольского нашествия.", "correct": "True", "explanation": "..."}"""
 
-    if language == "Biology":
-        return """For multiple_choice:
+_EXAMPLES_BIOLOGY = """For multiple_choice:
 {"type": "multiple_choice", "question": "Какой орган перекачивает кровь по организму?", "options": ["Печень", "Сердце", "Почки", "Легкие"], "correct": "Сердце", "explanation": "..."}
 IMPORTANT: "options" must contain answer text, not A/B/C/D labels.
 
@@ -64,7 +60,7 @@ For fill_blank:
 For true_false:
 {"type": "true_false", "question": "Клетка является структурной единицей живых организмов.", "correct": "True", "explanation": "..."}"""
 
-    return """For multiple_choice:
+_EXAMPLES_DEFAULT = """For multiple_choice:
 {"type": "multiple_choice", "question": "Выбери правильный вариант ответа по теме.", "options": ["вариант 1", "вариант 2", "вариант 3", "вариант 4"], "correct": "вариант 1", "explanation": "..."}
 IMPORTANT: "options" must contain answer text, not A/B/C/D labels.
 
@@ -74,24 +70,50 @@ For fill_blank:
 For true_false:
 {"type": "true_false", "question": "Утверждение по теме.", "correct": "True", "explanation": "..."}"""
 
+# Примеры по предмету: одна выборка из таблицы вместо цепочки сравнений
+_EXAMPLES = {
+    "English": _EXAMPLES_LANGUAGE,
+    "French": _EXAMPLES_LANGUAGE,
+    "German": _EXAMPLES_LANGUAGE,
+    "Spanish": _EXAMPLES_SPANISH,
+    "Mathematics": _EXAMPLES_MATHEMATICS,
+    "History": _EXAMPLES_HISTORY,
+    "Biology": _EXAMPLES_BIOLOGY,
+}
+
+
+# Языки с переводными заданиями: (язык задания, язык ответа)
+_SOURCE_TARGET = {
+    "English": ("Russian", "English"),
+    "Spanish": ("Russian", "Spanish"),
+    "French": ("Russian", "French"),
+    "German": ("Russian", "German"),
+}
+
+_QUESTION_TYPES = """- multiple_choice: A question with 4 answer options. Exactly one is correct.
+- fill_blank: A sentence with one word replaced by "___". The student must type the missing word.
+- true_false: A statement that is either true or false.
+- matching: A simple matching task, student answers with one text line.
+- audio: Short listening-style question (you may include "audio_text" field with transcript).
+"""
 
-def build_test_prompt(
-    language: str,
-    topic: str,
-    count: int,
-    level: str = "A2",
-    previous_questions: list[str] | None = None,
-) -> str:
-    level_desc = settings.LEVEL_DESCRIPTIONS.get(level, f"{level} level student")
-
-    source_target = {
-        "English": ("Russian", "English"),
-        "Spanish": ("Russian", "Spanish"),
-        "French": ("Russian", "French"),
-        "German": ("Russian", "German"),
-    }
-    source_lang, target_lang = source_target.get(language, ("Russian", "Russian"))
-    translation_allowed = language in source_target
+
+# Справочник уровней заморожен в config и не меняется после загрузки
+_LEVEL_DESCRIPTIONS = settings.LEVEL_DESCRIPTIONS
+
+
+@lru_cache(maxsize=32)
+def build_test_system_prompt(language: str) -> str:
+    """
+    Return the static instructions for a language: question types, rules,
+    output format and examples.
+
+    The text is identical for every request in that language and is sent first,
+    so the LLM backend can serve it from its prompt prefix cache. Level, topic
+    and count go into the per-request prompt from build_test_prompt.
+    """
+    source_lang, target_lang = _SOURCE_TARGET.get(language, ("Russian", "Russian"))
+    translation_allowed = language in _SOURCE_TARGET
     content_language = language if translation_allowed else "Russian"
 
     translation_rule = (
@@ -99,45 +121,50 @@ def build_test_prompt(
         if translation_allowed
         else "- translation questions are optional and usually should not be used for this subject."
     )
-    subject_rule = (
-        f"8. This test is strictly for {language}. Do not include content from other subjects/languages."
-    )
-
-    examples = _examples_for_language(language)
 
-    prompt = f"""You are an educational test generator.
-
-Language being tested: {language}
-Student level: {level} - {level_desc}
-Topic: {topic}
-Number of questions: {count}
+    return f"""You are an educational test generator.
 
-Generate exactly {count} test questions for {language}. Mix the following question types for variety:
-- multiple_choice: A question with 4 answer options. Exactly one is correct.
-- fill_blank: A sentence with one word replaced by "___". The student must type the missing word.
-- true_false: A statement that is either true or false.
-- matching: A simple matching task, student answers with one text line.
-- audio: Short listening-style question (you may include "audio_text" field with transcript).
-{translation_rule}
+Mix the following question types for variety:
+{_QUESTION_TYPES}{translation_rule}
 
 Rules:
-1. Difficulty must be appropriate for a {level} ({level_desc}) student.
-2. All content must be related to the topic "{topic}".
-3. All questions and options MUST be in {content_language} (except translations from {source_lang}, if used).
-4. For wrong answers in multiple_choice, make distractors plausible but clearly wrong.
-5. For each question, provide a brief explanation (1-2 sentences) in Russian.
-6. Output ONLY a valid JSON array, no extra text before or after.
-7. Ensure maximum variety: no repeated words/sentences.
-{subject_rule}
+1. All questions and options MUST be in {content_language} (except translations from {source_lang}, if used).
+2. For wrong answers in multiple_choice, make distractors plausible but clearly wrong.
+3. For each question, provide a brief explanation (1-2 sentences) in Russian.
+4. Output ONLY a valid JSON array, no extra text before or after.
+5. Ensure maximum variety: no repeated words/sentences.
+6. This test is strictly for {language}. Do not include content from other subjects/languages.
 
 Output format - JSON array of objects. Each object must follow examples:
 
-{examples}
+{_EXAMPLES.get(language, _EXAMPLES_DEFAULT)}"""
+
+
+def build_test_prompt(
+    language: str,
+    topic: str,
+    count: int,
+    level: str = "A2",
+    previous_questions: list[str] | None = None,
+) -> str:
+    """Return the per-request task; send it with build_test_system_prompt(language)."""
+    level_desc = _LEVEL_DESCRIPTIONS.get(level)
+    if level_desc is None:
+        level_desc = f"{level} level student"
+
+    prompt = f"""Language being tested: {language}
+Student level: {level} - {level_desc}
+Topic: {topic}
+Number of questions: {count}
+
+Generate exactly {count} test questions for {language}.
+Difficulty must be appropriate for a {level} ({level_desc}) student.
+All content must be related to the topic "{topic}".
 
 Generate exactly {count} questions as a JSON array. Output ONLY the JSON array:"""
 
     if previous_questions:
-        numbered = "\n".join(f"{i + 1}. {q}" for i, q in enumerate(previous_questions))
+        numbered = "\n".join(f"{i}. {q}" for i, q in enumerate(previous_questions, start=1))
         return prompt + f"""
 
 IMPORTANT - DO NOT REPEAT THESE QUESTIONS.
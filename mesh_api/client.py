@@ -1,6 +1,7 @@
 """Main МЭШ API client — обёртка над OctoDiary."""
 import logging
 from typing import List, Optional
+from dataclasses import replace
 from datetime import date, timedelta
 
 from octodiary.apis.async_ import AsyncMobileAPI
@@ -112,12 +113,9 @@ class MeshClient:
             if lesson:
                 lessons.append(lesson)
 
-        # Сортируем по времени и проставляем номера уроков
+        # Сортируем по времени и проставляем номера уроков (Lesson неизменяем)
         lessons.sort(key=lambda l: l.time_start)
-        for i, lesson in enumerate(lessons, 1):
-            lesson.number = i
-
-        return lessons
+        return [replace(lesson, number=i) for i, lesson in enumerate(lessons, 1)]
 
     async def get_grades(
         self,
@@ -253,3 +251,9 @@ class MeshClient:
     async def close(self):
         """Закрыть сессию (для совместимости с существующим кодом)."""
         pass
+
+    async def __aenter__(self) -> "MeshClient":
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        await self.close()
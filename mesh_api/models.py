@@ -17,9 +17,9 @@ class Student:
     class_unit_id: Optional[int] = None    # нужен для school_info
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class Lesson:
-    """Single lesson in schedule."""
+    """Single lesson in schedule (immutable; renumber via dataclasses.replace)."""
     number: int
     subject: str
     time_start: str
@@ -13,7 +13,7 @@ logger = logging.getLogger(__name__)
 BLOCKED_MSG = "❗ Доступ ограничен. Обратитесь к администратору."
 
 # Команды, доступные без авторизации
-_PUBLIC_COMMANDS = {"/start", "/help"}
+_PUBLIC_COMMANDS = frozenset({"/start", "/help"})
 
 # Callback-префиксы, пропускаемые без проверки (регистрация МЭШ, выбор детей)
 _PUBLIC_CALLBACK_PREFIXES = (
@@ -47,11 +47,10 @@ class AccessControlMiddleware(BaseMiddleware):
             return await handler(event, data)
 
         # Публичные команды — пропускаем (start покажет "доступ ограничен" сам)
-        if isinstance(event, Message) and event.text:
-            cmd = event.text.split()[0].lower() if event.text.startswith("/") else None
+        # Обычный текст (ответы квиза) отсекается по первому символу, без разбора строки
+        if isinstance(event, Message) and event.text and event.text.startswith("/"):
             # Убираем суффикс бота (/start@botname → /start)
-            if cmd and "@" in cmd:
-                cmd = cmd.split("@")[0]
+            cmd = event.text.split(maxsplit=1)[0].partition("@")[0].lower()
             if cmd in _PUBLIC_COMMANDS:
                 return await handler(event, data)
 
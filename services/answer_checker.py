@@ -1,43 +1,34 @@
 """Answer checking and normalization for quiz questions."""
-import re
+from functools import lru_cache
+
+# Таблица удаления пунктуации для str.translate — один проход без regex
+_PUNCTUATION_TABLE = str.maketrans("", "", ".,!?;:\"'()—–-")
+
+# Типы, для которых кроме correct принимаются варианты из accept_also
+_ALTERNATIVES_TYPES = frozenset({"translation", "matching", "audio"})
+_EXACT_TYPES = frozenset({"multiple_choice", "true_false", "fill_blank"})
 
 
 def check_answer(question: dict, user_answer: str) -> bool:
     """Check if the user's answer is correct for the given question."""
     q_type = question["type"]
-    correct = question["correct"]
-
-    if q_type == "multiple_choice":
-        return _normalize(user_answer) == _normalize(correct)
-
-    elif q_type == "true_false":
-        return _normalize(user_answer) == _normalize(correct)
-
-    elif q_type == "fill_blank":
-        return _normalize(user_answer) == _normalize(correct)
-
-    elif q_type == "translation":
-        if _normalize(user_answer) == _normalize(correct):
-            return True
-        for alt in question.get("accept_also", []):
-            if _normalize(user_answer) == _normalize(alt):
-                return True
+    if q_type in _ALTERNATIVES_TYPES:
+        accepted = _accepted_answers(question["correct"], tuple(question.get("accept_also") or ()))
+    elif q_type in _EXACT_TYPES:
+        accepted = _accepted_answers(question["correct"], ())
+    else:
         return False
+    return _normalize(user_answer) in accepted
 
-    elif q_type in {"matching", "audio"}:
-        if _normalize(user_answer) == _normalize(correct):
-            return True
-        for alt in question.get("accept_also", []):
-            if _normalize(user_answer) == _normalize(alt):
-                return True
-        return False
 
-    return False
+@lru_cache(maxsize=4096)
+def _accepted_answers(correct: str, accept_also: tuple[str, ...]) -> frozenset[str]:
+    """Normalized correct answer and alternatives, built once per question."""
+    return frozenset(_normalize(answer) for answer in (correct, *accept_also))
 
 
+@lru_cache(maxsize=4096)
 def _normalize(text: str) -> str:
     """Normalize text for comparison: lowercase, strip, remove punctuation."""
-    text = text.strip().lower()
-    text = re.sub(r"[.,!?;:\"'()—–\-]", "", text)
-    text = re.sub(r"\s+", " ", text)
-    return text
+    # split() без аргументов и обрезает края, и схлопывает пробелы
+    return " ".join(text.translate(_PUNCTUATION_TABLE).lower().split())
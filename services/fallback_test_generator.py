@@ -243,14 +243,16 @@ _BIOLOGY_POOL: list[dict] = [
 ]
 
 
-def _subject_pool(language: str) -> list[dict]:
-    if language == "Mathematics":
-        return _MATH_POOL
-    if language == "History":
-        return _HISTORY_POOL
-    if language == "Biology":
-        return _BIOLOGY_POOL
-    return _ENGLISH_POOL
+# Банк вопросов по предмету; неизвестные предметы получают английский
+_POOLS = {
+    "English": _ENGLISH_POOL,
+    "Spanish": _SPANISH_POOL,
+    "French": _FRENCH_POOL,
+    "German": _GERMAN_POOL,
+    "Mathematics": _MATH_POOL,
+    "History": _HISTORY_POOL,
+    "Biology": _BIOLOGY_POOL,
+}
 
 
 def _apply_variant(item: dict, variant_no: int) -> dict:
@@ -266,18 +268,7 @@ def _apply_variant(item: dict, variant_no: int) -> dict:
 
 def generate_fallback_test(language: str, topic: str, count: int, level: str = "A2") -> list[dict]:
     """Build a deterministic fallback quiz with expected schema."""
-    if language == "English":
-        pool = _ENGLISH_POOL
-    elif language == "Spanish":
-        pool = _SPANISH_POOL
-    elif language == "French":
-        pool = _FRENCH_POOL
-    elif language == "German":
-        pool = _GERMAN_POOL
-    elif language in {"Mathematics", "History", "Biology"}:
-        pool = _subject_pool(language)
-    else:
-        pool = _ENGLISH_POOL
+    pool = _POOLS.get(language, _ENGLISH_POOL)
 
     result: list[dict] = []
     for idx in range(count):
@@ -4,6 +4,8 @@ from datetime import date, timedelta
 from math import floor, sqrt
 from typing import Optional
 
+from config import SUBJECT_FLAGS, DEFAULT_SUBJECT_FLAG
+
 logger = logging.getLogger(__name__)
 
 # ---------------------------------------------------------------------------
@@ -369,7 +371,7 @@ def format_results_text(
 ) -> str:
     """Format the full themed results text."""
     theme = get_theme(theme_key)
-    lang_flag = "\U0001f1ec\U0001f1e7" if language == "English" else "\U0001f1ea\U0001f1f8"
+    lang_flag = SUBJECT_FLAGS.get(language, DEFAULT_SUBJECT_FLAG)
 
     comment = get_result_comment(theme_key, percent)
 
@@ -31,6 +31,7 @@ from database.crud import (
     mark_homework_summary_sent,
     disable_all_notifications,
     cleanup_old_cache,
+    delete_expired_cached_quizzes,
     log_activity,
     save_notification_run,
     get_last_notification_run,
@@ -1327,13 +1328,12 @@ async def _cleanup_stale_cache_on_start():
     from core.database import get_db
     try:
         db = get_db()
-        conn = await db.connect()
-        for table in ("grades_cache", "homework_cache"):
-            await conn.execute(
-                f"UPDATE {table} SET is_notified = 1 "
-                f"WHERE is_notified = 0 AND created_at < datetime('now', '-2 days')"
-            )
-        await conn.commit()
+        async with db.transaction() as conn:
+            for table in ("grades_cache", "homework_cache"):
+                await conn.execute(
+                    f"UPDATE {table} SET is_notified = 1 "
+                    f"WHERE is_notified = 0 AND created_at < datetime('now', '-2 days')"
+                )
         logger.info("Уведомления: устаревший кеш (>2 дней) помечен при старте")
     except Exception as e:
         logger.warning("Уведомления: не удалось очистить кеш при старте: %s", e)
@@ -1343,4 +1343,6 @@ async def _cleanup_cache_job():
     """Еженедельная очистка старого кеша."""
     logger.info("Уведомления: очистка кеша старше 30 дней...")
     await cleanup_old_cache(30)
+    from services.test_generator import QUIZ_CACHE_TTL_SECONDS
+    await delete_expired_cached_quizzes(QUIZ_CACHE_TTL_SECONDS)
     logger.info("Уведомления: очистка кеша завершена")
@@ -1,45 +1,61 @@
 """Format quiz history and statistics."""
-from database.crud import get_user_sessions, get_weak_topics, get_stats_summary
+import asyncio
+
+from config import SUBJECT_FLAGS, DEFAULT_SUBJECT_FLAG
+from database.crud import get_user_sessions, get_weak_topics, get_stats_summary, get_topic_progress
 
 
 async def format_history(user_id: int) -> str:
     """Format recent test history as a readable text."""
-    sessions = await get_user_sessions(user_id)
+    return _render_history(await get_user_sessions(user_id))
 
-    if not sessions:
-        return "📭 Ты ещё не проходил тесты. Начни первый тест!"
 
-    lines = ["📋 Последние тесты:\n"]
-    for s in sessions:
-        lang_flag = "🇬🇧" if s["language"] == "English" else "🇪🇸"
-        score = round(s["score_percent"])
-        lines.append(
-            f"{lang_flag} {s['topic']} — {s['correct_answers']}/{s['total_questions']} ({score}%)"
-        )
+async def format_weak_areas(user_id: int) -> str:
+    """Format weak topics as a readable text."""
+    return _render_weak_areas(await get_weak_topics(user_id))
+
 
-    return "\n".join(lines)
+async def format_overall_stats(user_id: int) -> str:
+    """Format overall statistics."""
+    return _render_overall_stats(await get_stats_summary(user_id))
 
 
-async def format_weak_areas(user_id: int) -> str:
-    """Format weak topics as a readable text."""
-    weak = await get_weak_topics(user_id)
+async def format_progress_report(user_id: int) -> tuple[str, str, str]:
+    """
+    Format history, weak areas and overall stats together.
 
-    if not weak:
-        return ""
+    Weak topics and overall stats come from one grouped query over
+    test_sessions; recent history is read concurrently with it.
+    """
+    sessions, (weak, stats) = await asyncio.gather(
+        get_user_sessions(user_id),
+        get_topic_progress(user_id),
+    )
+    return _render_history(sessions), _render_weak_areas(weak), _render_overall_stats(stats)
 
-    lines = ["\n⚠️ Темы, которые нужно подтянуть:\n"]
-    for w in weak:
-        lang_flag = "🇬🇧" if w["language"] == "English" else "🇪🇸"
-        avg = round(w["avg_score"])
-        lines.append(f"{lang_flag} {w['topic']} — средний балл {avg}%")
 
-    return "\n".join(lines)
+def _render_history(sessions: list[dict]) -> str:
+    if not sessions:
+        return "📭 Ты ещё не проходил тесты. Начни первый тест!"
 
+    return "📋 Последние тесты:\n\n" + "\n".join(
+        f"{SUBJECT_FLAGS.get(s['language'], DEFAULT_SUBJECT_FLAG)} {s['topic']} — "
+        f"{s['correct_answers']}/{s['total_questions']} ({round(s['score_percent'])}%)"
+        for s in sessions
+    )
+
+
+def _render_weak_areas(weak: list[dict]) -> str:
+    if not weak:
+        return ""
+
+    return "\n⚠️ Темы, которые нужно подтянуть:\n\n" + "\n".join(
+        f"{SUBJECT_FLAGS.get(w['language'], DEFAULT_SUBJECT_FLAG)} {w['topic']} — средний балл {round(w['avg_score'])}%"
+        for w in weak
+    )
 
-async def format_overall_stats(user_id: int) -> str:
-    """Format overall statistics."""
-    stats = await get_stats_summary(user_id)
 
+def _render_overall_stats(stats: dict) -> str:
     if not stats or not stats.get("total_tests"):
         return ""
 
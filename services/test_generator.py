@@ -1,15 +1,215 @@
 """Test generation via LLM."""
+import asyncio
 import logging
+import random
+import sys
+import time
+from functools import lru_cache
 
 from config import settings
+from database import crud
 from llm.client import chat_completion, get_last_llm_error
-from llm.prompts import build_test_prompt
+from llm.prompts import build_test_prompt, build_test_system_prompt
 from llm.parser import parse_questions
 from services.fallback_test_generator import generate_fallback_test
 
 logger = logging.getLogger(__name__)
 
 
+# Тесты, сгенерированные LLM, переиспользуются для той же темы: генерация занимает 10-20 с.
+# Ключ — (язык, уровень, тема, число вопросов).
+QUIZ_CACHE_TTL_SECONDS = 6 * 60 * 60
+QUIZ_CACHE_MAX = 256
+_quiz_cache: dict[tuple[str, str, str, int], tuple[float, tuple[dict, ...]]] = {}
+
+
+def _cache_quiz(
+    key: tuple[str, str, str, int], questions: list[dict], cached_at: float | None = None,
+) -> None:
+    """Remember a generated quiz, evicting the oldest entry when full."""
+    if key not in _quiz_cache and len(_quiz_cache) >= QUIZ_CACHE_MAX:
+        _quiz_cache.pop(next(iter(_quiz_cache)))
+    _quiz_cache[key] = (time.monotonic() if cached_at is None else cached_at, tuple(questions))
+
+
+@lru_cache(maxsize=1024)
+def _topic_key(topic: str) -> str:
+    """
+    Normalize a topic for the cache key.
+
+    Only case and whitespace are normalized, so "Present Simple" and
+    "  present  simple " share one entry, while word order and punctuation are
+    kept: "Simple present" or "Present Simple?" are different topics.
+    The result is interned, so repeated starts of a topic reuse one key object.
+    """
+    return sys.intern(" ".join(topic.casefold().split()))
+
+
+# Кэш дублируется в SQLite (таблица quiz_cache), чтобы переживать перезапуск бота
+def _persisted_key(key: tuple[str, str, str, int]) -> str:
+    return "|".join(str(part) for part in key)
+
+
+async def _remember_quiz(key: tuple[str, str, str, int], questions: list[dict]) -> None:
+    """Cache a generated quiz in memory and in the database."""
+    _cache_quiz(key, questions)
+    try:
+        await crud.save_cached_quiz(_persisted_key(key), questions, time.time())
+    except Exception:
+        logger.warning("Could not persist generated quiz to cache")
+
+
+async def _load_persisted_quiz(key: tuple[str, str, str, int]) -> None:
+    """Warm the in-memory cache from the database after a restart."""
+    try:
+        found = await crud.get_cached_quiz(_persisted_key(key), QUIZ_CACHE_TTL_SECONDS)
+    except Exception:
+        logger.warning("Could not read persisted quiz cache")
+        return
+    if found:
+        created_at, questions = found
+        # В памяти время монотонное: переносим возраст записи, а не метку
+        _cache_quiz(key, questions, cached_at=time.monotonic() - (time.time() - created_at))
+
+
+def _get_cached_quiz(key: tuple[str, str, str, int], seen: list[str]) -> list[dict] | None:
+    """
+    Return a reshuffled copy of a cached quiz, or None.
+
+    Questions the user already answered recently are skipped, so a repeat of the
+    same topic falls through to a fresh generation instead of the same test.
+    """
+    entry = _quiz_cache.get(key)
+    if entry is None:
+        return None
+    cached_at, questions = entry
+    if time.monotonic() - cached_at >= QUIZ_CACHE_TTL_SECONDS:
+        _quiz_cache.pop(key, None)
+        return None
+
+    seen_set = set(seen)
+    fresh = [q for q in questions if q.get("question") not in seen_set]
+    count = key[3]
+    if len(fresh) < count:
+        return None
+
+    picked = random.sample(fresh, count)
+    result = []
+    for q in picked:
+        item = dict(q)
+        if item.get("options"):
+            # correct хранится текстом варианта, поэтому порядок можно менять свободно
+            item["options"] = random.sample(item["options"], len(item["options"]))
+        result.append(item)
+    return result
+
+
+# С этого размера тест генерируется двумя параллельными запросами по половине вопросов:
+# время ответа LLM растёт с длиной вывода, а половины идут одновременно.
+SPLIT_GENERATION_MIN_COUNT = 10
+
+
+async def _generate_questions(
+    language: str,
+    topic: str,
+    count: int,
+    level: str,
+    previous_questions: list[str],
+) -> list[dict] | None:
+    """First generation attempt; large tests are split into two concurrent LLM calls."""
+    system = build_test_system_prompt(language)
+    if count < SPLIT_GENERATION_MIN_COUNT:
+        prompt = build_test_prompt(language, topic, count, level=level, previous_questions=previous_questions or None)
+        raw = await chat_completion(prompt, system=system)
+        return parse_questions(raw) if raw else None
+
+    halves = (count - count // 2, count // 2)
+    raws = await asyncio.gather(*(
+        chat_completion(build_test_prompt(
+            language, topic, part, level=level, previous_questions=previous_questions or None,
+        ), system=system)
+        for part in halves
+    ))
+
+    # Половины генерируются независимо, поэтому совпавшие вопросы отбрасываем
+    merged: list[dict] = []
+    seen: set[str] = set()
+    for raw in raws:
+        for q in (parse_questions(raw) if raw else None) or ():
+            text = q.get("question")
+            if text not in seen:
+                seen.add(text)
+                merged.append(q)
+    return merged or None
+
+
+_STRICT_SUFFIX = "\n\nIMPORTANT: Output ONLY a valid JSON array. No markdown, no extra text."
+
+
+async def _retry_questions(
+    language: str,
+    topic: str,
+    count: int,
+    level: str,
+    previous_questions: list[str],
+) -> list[dict] | None:
+    """Second generation attempt with a stricter output instruction."""
+    prompt = build_test_prompt(language, topic, count, level=level, previous_questions=previous_questions or None)
+    # Системная часть та же, что в первой попытке, — её префикс уже в кэше LLM
+    raw = await chat_completion(prompt + _STRICT_SUFFIX, system=build_test_system_prompt(language))
+    return parse_questions(raw) if raw else None
+
+
+async def _generate_with_retry(
+    language: str,
+    topic: str,
+    count: int,
+    level: str,
+    previous_questions: list[str],
+) -> list[dict] | None:
+    """
+    Generate questions, retrying once with a stricter prompt if too few come back.
+
+    With LLM_SPECULATIVE_RETRY the retry starts as soon as the first attempt has
+    run for LLM_SPECULATIVE_RETRY_DELAY seconds; the first sufficient result wins
+    and the other request is cancelled. The flag is off by default because the
+    speculative request is billed even when the first attempt succeeds.
+    """
+    args = (language, topic, count, level, previous_questions)
+    if not settings.LLM_SPECULATIVE_RETRY:
+        questions = await _generate_questions(*args)
+        if questions and len(questions) >= count:
+            return questions
+        logger.info("First attempt didn't produce enough questions, retrying...")
+        return await _retry_questions(*args)
+
+    first = asyncio.create_task(_generate_questions(*args))
+    pending = {first}
+    try:
+        done, pending = await asyncio.wait(pending, timeout=settings.LLM_SPECULATIVE_RETRY_DELAY)
+        if done:
+            questions = first.result()
+            if questions and len(questions) >= count:
+                return questions
+            logger.info("First attempt didn't produce enough questions, retrying...")
+            return await _retry_questions(*args)
+
+        logger.info("First attempt is slow, starting speculative retry")
+        retry = asyncio.create_task(_retry_questions(*args))
+        pending = {first, retry}
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                questions = task.result()
+                if questions and len(questions) >= count:
+                    return questions
+        # Ни одна попытка не дала полного теста — как и без флага, берём ответ повтора
+        return retry.result()
+    finally:
+        for task in pending:
+            task.cancel()
+
+
 def _mark_source(questions: list[dict], source: str, reason: str | None = None) -> list[dict]:
     """Attach generation source marker to each question."""
     marked: list[dict] = []
@@ -22,51 +222,55 @@ def _mark_source(questions: list[dict], source: str, reason: str | None = None)
     return marked
 
 
-async def generate_test(language: str, topic: str, count: int, user_id: int | None = None, level: str = "A2") -> list[dict] | None:
-    """Generate a test with the given parameters. Returns list of questions or None."""
-    imported_questions: list[dict] = []
+async def _fetch_imported_questions(language: str, level: str, topic: str, count: int) -> list[dict]:
     try:
-        from database.crud import get_imported_questions
-        imported_questions = await get_imported_questions(language, level, topic, limit=count)
+        return await crud.get_imported_questions(language, level, topic, limit=count)
     except Exception:
         logger.warning("Could not fetch imported questions, continuing with LLM")
+        return []
 
-    if len(imported_questions) >= count:
-        return _mark_source(imported_questions[:count], "imported")
 
-    previous_questions: list[str] = []
-    if user_id:
-        try:
-            from database.crud import get_recent_questions
-            previous_questions = await get_recent_questions(user_id, language, topic)
-        except Exception:
-            logger.warning("Could not fetch question history, proceeding without it")
+async def _fetch_previous_questions(user_id: int | None, language: str, topic: str) -> list[str]:
+    if not user_id:
+        return []
+    try:
+        return await crud.get_recent_questions(user_id, language, topic)
+    except Exception:
+        logger.warning("Could not fetch question history, proceeding without it")
+        return []
 
-    prompt = build_test_prompt(language, topic, count, level=level, previous_questions=previous_questions or None)
 
-    # First attempt
-    raw = await chat_completion(prompt)
-    questions = parse_questions(raw) if raw else None
+async def generate_test(language: str, topic: str, count: int, user_id: int | None = None, level: str = "A2") -> list[dict] | None:
+    """Generate a test with the given parameters. Returns list of questions or None."""
+    # Оба чтения идут через пул читателей, поэтому выполняются параллельно
+    imported_questions, previous_questions = await asyncio.gather(
+        _fetch_imported_questions(language, level, topic, count),
+        _fetch_previous_questions(user_id, language, topic),
+    )
+
+    if len(imported_questions) >= count:
+        return _mark_source(imported_questions[:count], "imported")
 
-    if questions and len(questions) >= count:
-        if imported_questions:
-            missing = max(0, count - len(imported_questions))
-            if missing > 0:
-                return _mark_source(imported_questions + questions[:missing], "imported")
-        return _mark_source(questions[:count], "llm")
+    cache_key = (language, level, _topic_key(topic), count)
+    if not imported_questions:
+        if cache_key not in _quiz_cache:
+            await _load_persisted_quiz(cache_key)
+        cached = _get_cached_quiz(cache_key, previous_questions)
+        if cached:
+            logger.info("Quiz cache hit: %s / %s / %s (%d)", language, level, topic, count)
+            return cached
 
-    # Retry once with a stricter prompt
-    logger.info("First attempt didn't produce enough questions, retrying...")
-    retry_prompt = prompt + "\n\nIMPORTANT: Output ONLY a valid JSON array. No markdown, no extra text."
-    raw = await chat_completion(retry_prompt)
-    questions = parse_questions(raw) if raw else None
+    questions = await _generate_with_retry(language, topic, count, level, previous_questions)
 
     if questions:
         if imported_questions:
             missing = max(0, count - len(imported_questions))
             if missing > 0:
                 return _mark_source(imported_questions + questions[:missing], "imported")
-        return _mark_source(questions[:count], "llm")
+        result = _mark_source(questions[:count], "llm")
+        if len(result) >= count:
+            await _remember_quiz(cache_key, result)
+        return result
 
     if settings.LLM_FALLBACK_ENABLED:
         reason = get_last_llm_error() or "LLM unavailable"
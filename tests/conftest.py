@@ -1,13 +1,22 @@
-"""Общие фикстуры для тестов школьного бота."""
-import pytest
+"""Общие фикстуры для тестов школьного бота.
+
+Фикстуры с данными неизменяемы и создаются один раз на сессию:
+списки отдаются кортежами, словари — через MappingProxyType.
+Фабрики моков (make_*) создают свежий объект на каждый вызов.
+"""
 from datetime import date
+from types import MappingProxyType
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
 from mesh_api.models import Lesson
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def sample_lessons():
     """Список уроков со всеми заполненными полями."""
-    return [
+    return (
         Lesson(
             number=1,
             subject="Математика",
@@ -24,27 +33,27 @@ def sample_lessons():
             teacher="Петрова М.И.",
             room="205",
         ),
-    ]
+    )
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def sample_user():
     """Зарегистрированный пользователь из БД."""
-    return {
+    return MappingProxyType({
         "user_id": 12345,
         "mesh_login": "test_login",
         "mesh_password": "test_pass",
         "mesh_token": "valid_token",
         "token_expires_at": "2026-03-01T12:00:00",
         "is_active": 1,
-    }
+    })
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def sample_children():
     """Один ребёнок, привязанный к пользователю."""
-    return [
-        {
+    return (
+        MappingProxyType({
             "child_id": 1,
             "user_id": 12345,
             "student_id": 100,
@@ -52,15 +61,15 @@ def sample_children():
             "last_name": "Иванов",
             "class_name": "9А",
             "is_active": 1,
-        }
-    ]
+        }),
+    )
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def multiple_children():
     """Несколько детей, привязанных к пользователю."""
-    return [
-        {
+    return (
+        MappingProxyType({
             "child_id": 1,
             "user_id": 12345,
             "student_id": 100,
@@ -68,8 +77,8 @@ def multiple_children():
             "last_name": "Иванов",
             "class_name": "9А",
             "is_active": 1,
-        },
-        {
+        }),
+        MappingProxyType({
             "child_id": 2,
             "user_id": 12345,
             "student_id": 200,
@@ -77,11 +86,61 @@ def multiple_children():
             "last_name": "Иванова",
             "class_name": "5Б",
             "is_active": 1,
-        },
-    ]
+        }),
+    )
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def today():
     """Фиксированная дата для тестов (среда)."""
     return date(2026, 2, 25)  # Среда
+
+
+@pytest.fixture(scope="session")
+def make_user_dict():
+    """Фабрика словаря пользователя для моков ensure_token."""
+
+    def _make(token: str = "old_token", expires_at: str = None) -> dict:
+        return {
+            "user_id": 12345,
+            "mesh_login": "login",
+            "mesh_password": "pass",
+            "mesh_token": token,
+            "token_expires_at": expires_at,
+            "mesh_refresh_token": None,
+            "mesh_client_id": None,
+            "mesh_client_secret": None,
+        }
+
+    return _make
+
+
+@pytest.fixture(scope="session")
+def make_message():
+    """Фабрика мока объекта Message."""
+
+    def _make(user_id: int = 12345) -> AsyncMock:
+        message = AsyncMock()
+        message.from_user = MagicMock()
+        message.from_user.id = user_id
+        message.answer = AsyncMock()
+        return message
+
+    return _make
+
+
+@pytest.fixture(scope="session")
+def make_callback():
+    """Фабрика мока объекта CallbackQuery."""
+
+    def _make(user_id: int = 12345, data: str = "sched:child:100") -> AsyncMock:
+        callback = AsyncMock()
+        callback.from_user = MagicMock()
+        callback.from_user.id = user_id
+        callback.data = data
+        callback.message = AsyncMock()
+        callback.message.edit_text = AsyncMock()
+        callback.answer = AsyncMock()
+        return callback
+
+    return _make
@@ -1,4 +1,6 @@
 """Тесты middleware контроля доступа."""
+from contextlib import asynccontextmanager
+
 import pytest
 from unittest.mock import AsyncMock, MagicMock, patch
 
@@ -161,3 +163,75 @@ class TestAccessControlMiddleware:
         handler = AsyncMock()
         result = await mw(handler, event, {})
         handler.assert_not_called()
+
+
+class TestIsUserAllowedCache:
+    """Тесты TTL-кэша is_user_allowed."""
+
+    @pytest.fixture(autouse=True)
+    def _clear_access_cache(self):
+        from database import crud
+        crud._access_cache.clear()
+        yield
+        crud._access_cache.clear()
+
+    @pytest.fixture
+    def fake_db(self):
+        db = MagicMock()
+        # is_user_allowed читает (role, is_blocked); block_user — SELECT 1 по user_id
+        db.fetchone = AsyncMock(return_value=("student", 0))
+        db.execute = AsyncMock()
+        db.conn = MagicMock()
+        db.conn.execute = AsyncMock(return_value=MagicMock(fetchall=AsyncMock(return_value=[("student",)])))
+
+        @asynccontextmanager
+        async def _transaction():
+            yield db.conn
+
+        db.transaction = MagicMock(side_effect=_transaction)
+        with patch("database.crud.get_db", return_value=db):
+            yield db
+
+    async def test_repeated_check_hits_db_once(self, fake_db):
+        from database.crud import is_user_allowed
+        assert await is_user_allowed(123) == (True, "student")
+        assert await is_user_allowed(123) == (True, "student")
+        fake_db.fetchone.assert_awaited_once()
+
+    async def test_expired_entry_is_reloaded(self, fake_db):
+        from database import crud
+        with patch("database.crud.time.monotonic", side_effect=[0.0, crud.ACCESS_CACHE_TTL_SECONDS + 1]):
+            await crud.is_user_allowed(123)
+            await crud.is_user_allowed(123)
+        assert fake_db.fetchone.await_count == 2
+
+    @pytest.mark.parametrize("updated_rows, exists, expected", [
+        ([("student",)], None, "blocked"),
+        ([], (1,), "already_blocked"),
+        ([], None, "not_found"),
+    ])
+    async def test_block_user_invalidates(self, fake_db, updated_rows, exists, expected):
+        from database import crud
+        assert await crud.is_user_allowed(123) == (True, "student")
+        assert 123 in crud._access_cache
+
+        fake_db.conn.execute.return_value.fetchall.return_value = updated_rows
+        fake_db.fetchone.return_value = exists
+        assert await crud.block_user(123) == expected
+        fake_db.transaction.assert_called_once_with()
+        assert 123 not in crud._access_cache
+
+        # Следующая проверка идёт в БД и видит блокировку
+        fake_db.fetchone.reset_mock()
+        fake_db.fetchone.return_value = ("student", 1)
+        assert await crud.is_user_allowed(123) == (False, "student")
+        fake_db.fetchone.assert_awaited_once()
+
+    async def test_refreshing_expired_entry_does_not_evict_others(self, fake_db):
+        from database import crud
+        with patch.object(crud, "ACCESS_CACHE_MAX", 2), \
+                patch("database.crud.time.monotonic", side_effect=[0.0, 1.0, crud.ACCESS_CACHE_TTL_SECONDS + 1]):
+            await crud.is_user_allowed(1)
+            await crud.is_user_allowed(2)
+            await crud.is_user_allowed(1)
+        assert list(crud._access_cache) == [2, 1]
@@ -0,0 +1,142 @@
+"""Тесты записи через общее соединение писателя (core/database.py, пакетное сохранение сессий)."""
+import asyncio
+
+import pytest
+
+import core.database as core_db
+from database import crud
+
+
+@pytest.fixture
+async def real_db(tmp_path, monkeypatch):
+    db = await core_db.init_database(str(tmp_path / "test.db"))
+    monkeypatch.setattr(core_db, "db", db)
+    monkeypatch.setattr(crud, "_session_queue", None)
+    monkeypatch.setattr(crud, "_session_flusher", None)
+    await crud.ensure_quiz_user(1, "u", "f")
+    yield db
+    if crud._session_flusher is not None:
+        crud._session_flusher.cancel()
+    await db.close()
+
+
+def _answers(text, n=2):
+    return [
+        {"question_type": "true_false", "question_text": text, "correct_answer": "True",
+         "user_answer": "True", "is_correct": True, "explanation": ""}
+        for _ in range(n)
+    ]
+
+
+async def test_concurrent_execute_does_not_commit_half_of_a_session_batch(real_db, monkeypatch):
+    concurrent: list[asyncio.Task] = []
+    pack = crud.pack_answers_bitmap
+
+    def _pack_and_interleave(answers):
+        # Пока пакет пишется, другая корутина делает обычную запись с commit
+        if not concurrent:
+            concurrent.append(asyncio.create_task(real_db.execute(
+                "INSERT INTO achievements (user_id, badge_key) VALUES (1, 'concurrent')",
+            )))
+        return pack(answers)
+
+    monkeypatch.setattr(crud, "pack_answers_bitmap", _pack_and_interleave)
+
+    # Вторая запись не сохраняется (dict нельзя привязать к параметру): пакет
+    # откатывается целиком и пишется заново по одной записи
+    good, bad = await asyncio.gather(
+        crud.save_test_session(1, "English", "Good", 2, 2, 100.0, _answers("ok")),
+        crud.save_test_session(1, "English", "Bad", 2, 2, 100.0, _answers({"not": "bindable"})),
+        return_exceptions=True,
+    )
+    await concurrent[0]
+
+    assert isinstance(good, int)
+    assert isinstance(bad, Exception)
+    sessions = await real_db.fetchall("SELECT id, topic FROM test_sessions")
+    assert [tuple(row) for row in sessions] == [(good, "Good")]
+    results = await real_db.fetchall("SELECT session_id FROM question_results")
+    assert [row[0] for row in results] == [good, good]
+    assert await crud.get_user_badges(1) == ["concurrent"]
+
+
+async def test_failed_write_does_not_leave_transaction_open(real_db):
+    with pytest.raises(Exception):
+        await real_db.execute("INSERT INTO achievements (user_id, badge_key) VALUES (1, ?)", ({"x": 1},))
+
+    # Следующие записи открывают свою транзакцию и не падают на «transaction within a transaction»
+    await asyncio.gather(
+        crud.award_badges(1, ["first", "second"]),
+        real_db.execute("INSERT INTO achievements (user_id, badge_key) VALUES (1, 'third')"),
+        crud.block_user(1),
+    )
+    assert sorted(await crud.get_user_badges(1)) == ["first", "second", "third"]
+    assert not (await real_db.connect()).in_transaction
+
+
+async def test_single_session_save_is_written_without_batch_window(real_db, monkeypatch):
+    batches = []
+
+    async def _fake_insert(records):
+        batches.append(len(records))
+        return [42]
+
+    monkeypatch.setattr(crud, "_insert_test_sessions", _fake_insert)
+
+    # Одиночное сохранение не ждёт, пока подтянутся другие записи
+    session_id = await asyncio.wait_for(
+        crud.save_test_session(1, "English", "Alone", 2, 2, 100.0, _answers("ok")), 0.05,
+    )
+    assert session_id == 42
+    assert batches == [1]
+
+
+async def test_bad_record_does_not_drop_rest_of_batch(real_db, monkeypatch):
+    batches = []
+    insert = crud._insert_test_sessions
+
+    async def _counting_insert(records):
+        batches.append(len(records))
+        return await insert(records)
+
+    monkeypatch.setattr(crud, "_insert_test_sessions", _counting_insert)
+
+    first, bad, last = await asyncio.gather(
+        crud.save_test_session(1, "English", "First", 2, 2, 100.0, _answers("ok")),
+        crud.save_test_session(1, "English", "Bad", 2, 2, 100.0, _answers({"not": "bindable"})),
+        crud.save_test_session(1, "English", "Last", 2, 1, 50.0, _answers("ok")),
+        return_exceptions=True,
+    )
+
+    # Пакет из трёх записей откатился и был записан заново по одной
+    assert batches == [3, 1, 1, 1]
+    assert isinstance(bad, Exception)
+    sessions = await real_db.fetchall("SELECT id, topic FROM test_sessions ORDER BY id")
+    assert [tuple(row) for row in sessions] == [(first, "First"), (last, "Last")]
+    results = await real_db.fetchall("SELECT session_id, COUNT(*) FROM question_results GROUP BY session_id")
+    assert [tuple(row) for row in results] == [(first, 2), (last, 2)]
+
+
+async def test_distinct_counts_include_unsaved_session(real_db):
+    await crud.save_test_session(1, "English", "Past Simple", 2, 2, 100.0, _answers("ok"))
+
+    assert await crud.get_distinct_languages(1) == 1
+    # Та же тема ещё раз не считается, новая — считается, хотя в БД её нет
+    assert await crud.get_distinct_topics(1, include="Past Simple") == 1
+    assert await crud.get_distinct_topics(1, include="Present Perfect") == 2
+    assert await crud.get_distinct_languages(1, include="Spanish") == 2
+
+
+async def test_question_results_has_single_session_index(real_db):
+    rows = await real_db.fetchall(
+        "SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = 'question_results'",
+    )
+    assert "idx_question_results_session_id" not in {row[0] for row in rows}
+
+    # Индекс по session_id уже отдаёт ответы сессии в порядке id (rowid), без сортировки
+    plan = await real_db.fetchall(
+        "EXPLAIN QUERY PLAN SELECT id FROM question_results WHERE session_id = ? ORDER BY id DESC", (1,),
+    )
+    details = " ".join(row[3] for row in plan)
+    assert "idx_question_results_session" in details
+    assert "TEMP B-TREE" not in details
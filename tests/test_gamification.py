@@ -269,6 +269,19 @@ class TestThemes:
         assert "70" in text
         assert "250" in text
 
+    def test_format_results_text_uses_subject_flag(self):
+        text = format_results_text(
+            theme_key="neutral",
+            language="Mathematics",
+            topic="Дроби",
+            correct=5, total=5, percent=100,
+            xp_earned=50, streak_days=1,
+            level=1, xp_total=50,
+            new_badges=[],
+        )
+        assert "📐" in text
+        assert "\U0001f1ea\U0001f1f8" not in text
+
     def test_format_gamification_header(self):
         header = format_gamification_header(
             theme_key="neutral", streak=5, level=3, xp_total=400, badge_count=3,
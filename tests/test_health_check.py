@@ -1,9 +1,6 @@
-import pytest
-
 from services import health_check
 
 
-@pytest.mark.asyncio
 async def test_collect_health_no_llm_targets(monkeypatch):
     async def fake_db():
         return True, "ok"
@@ -17,7 +14,6 @@ async def test_collect_health_no_llm_targets(monkeypatch):
     assert status["llm_ok"] is False
 
 
-@pytest.mark.asyncio
 async def test_collect_health_llm_success(monkeypatch):
     async def fake_db():
         return True, "ok"
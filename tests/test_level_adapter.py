@@ -1,5 +1,4 @@
 """Tests for services/level_adapter.py -- grade extraction and CEFR mapping."""
-import pytest
 from unittest.mock import AsyncMock, patch
 
 from services.level_adapter import (
@@ -80,7 +79,6 @@ class TestAvailableLevels:
         assert AVAILABLE_LEVELS["Spanish"] == ["A1", "A1-A2", "A2", "B1"]
 
 
-@pytest.mark.asyncio
 class TestGetUserLevel:
     @patch("database.crud.get_user_children", new_callable=AsyncMock)
     @patch("database.crud.get_user_role", new_callable=AsyncMock)
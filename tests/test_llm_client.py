@@ -1,5 +1,4 @@
 """Tests for llm/client.py target selection and fallback order."""
-import pytest
 
 from llm import client
 from config import settings
@@ -17,7 +16,6 @@ def test_iter_targets_bridge_then_direct(monkeypatch):
     ]
 
 
-@pytest.mark.asyncio
 async def test_chat_completion_tries_direct_after_bridge_failure(monkeypatch):
     monkeypatch.setattr(settings, "LLM_BRIDGE_URL", "https://bridge.example/v1")
     monkeypatch.setattr(settings, "LLM_BASE_URL", "http://localhost:1234/v1")
@@ -25,7 +23,7 @@ async def test_chat_completion_tries_direct_after_bridge_failure(monkeypatch):
 
     calls: list[str] = []
 
-    async def fake_request(base_url, api_key, prompt, temperature, max_tokens):
+    async def fake_request(base_url, api_key, prompt, temperature, max_tokens, system=None):
         calls.append(base_url)
         if "bridge.example" in base_url:
             raise RuntimeError("bridge offline")
@@ -39,3 +37,86 @@ async def test_chat_completion_tries_direct_after_bridge_failure(monkeypatch):
         "https://bridge.example/v1",
         "http://localhost:1234/v1",
     ]
+
+
+async def test_chat_completion_bounds_parallel_requests(monkeypatch):
+    import asyncio
+
+    monkeypatch.setattr(settings, "LLM_BRIDGE_URL", None)
+    monkeypatch.setattr(settings, "LLM_BASE_URL", "http://localhost:1234/v1")
+    monkeypatch.setattr(client, "_llm_semaphore", asyncio.Semaphore(2))
+
+    in_flight = 0
+    max_in_flight = 0
+
+    async def fake_request(base_url, api_key, prompt, temperature, max_tokens, system=None):
+        nonlocal in_flight, max_in_flight
+        in_flight += 1
+        max_in_flight = max(max_in_flight, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        return prompt
+
+    monkeypatch.setattr(client, "_request_chat_completion", fake_request)
+
+    results = await asyncio.gather(*(client.chat_completion(f"p{i}") for i in range(5)))
+    assert results == [f"p{i}" for i in range(5)]
+    assert max_in_flight == 2
+
+
+async def test_request_sends_system_prefix_first(monkeypatch):
+    from types import SimpleNamespace
+
+    sent: dict = {}
+
+    class FakeClient:
+        def __init__(self, **kwargs):
+            self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+        async def _create(self, **kwargs):
+            sent.update(kwargs)
+            message = SimpleNamespace(content="[]")
+            return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+    monkeypatch.setattr(client, "AsyncOpenAI", FakeClient)
+    monkeypatch.setattr(client, "_clients", {})
+
+    result = await client._request_chat_completion(
+        "http://localhost:1234/v1", "key", "task", 0.7, 100, system="static rules",
+    )
+    assert result == "[]"
+    assert sent["messages"] == [
+        {"role": "system", "content": "static rules"},
+        {"role": "user", "content": "task"},
+    ]
+
+
+async def test_prewarm_reuses_one_client_per_endpoint(monkeypatch):
+    from types import SimpleNamespace
+
+    listed: list[str] = []
+
+    class FakeClient:
+        def __init__(self, **kwargs):
+            self.base_url = kwargs["base_url"]
+            self.models = SimpleNamespace(list=self._list)
+
+        def with_options(self, **kwargs):
+            return self
+
+        async def _list(self):
+            listed.append(self.base_url)
+            if "bridge" in self.base_url:
+                raise ConnectionError("bridge is down")
+
+    monkeypatch.setattr(settings, "LLM_BRIDGE_URL", "https://bridge.example/v1")
+    monkeypatch.setattr(settings, "LLM_BASE_URL", "http://localhost:1234/v1")
+    monkeypatch.setattr(client, "AsyncOpenAI", FakeClient)
+    monkeypatch.setattr(client, "_clients", {})
+
+    await client.prewarm()
+
+    assert listed == ["https://bridge.example/v1", "http://localhost:1234/v1"]
+    direct = client._get_client("http://localhost:1234/v1", settings.LLM_API_KEY or "not-needed")
+    assert client._get_client("http://localhost:1234/v1", settings.LLM_API_KEY or "not-needed") is direct
+    assert len(client._clients) == 2
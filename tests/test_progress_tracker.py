@@ -0,0 +1,57 @@
+"""Тесты форматирования истории и статистики (services/progress_tracker.py)."""
+from services import progress_tracker
+
+
+async def test_progress_report_reads_sessions_and_topic_progress_once(monkeypatch):
+    calls = []
+
+    async def fake_sessions(user_id):
+        calls.append("sessions")
+        return [{
+            "language": "English", "topic": "Present Simple",
+            "total_questions": 5, "correct_answers": 3, "score_percent": 60.0,
+        }]
+
+    async def fake_topic_progress(user_id):
+        calls.append("topic_progress")
+        weak = [{"language": "English", "topic": "Present Simple", "avg_score": 60.0, "attempts": 1}]
+        summary = {
+            "total_tests": 1, "avg_score": 60.0,
+            "total_questions_answered": 5, "total_correct": 3,
+        }
+        return weak, summary
+
+    monkeypatch.setattr(progress_tracker, "get_user_sessions", fake_sessions)
+    monkeypatch.setattr(progress_tracker, "get_topic_progress", fake_topic_progress)
+
+    history, weak, overall = await progress_tracker.format_progress_report(1)
+
+    assert sorted(calls) == ["sessions", "topic_progress"]
+    assert history == "📋 Последние тесты:\n\n🇬🇧 Present Simple — 3/5 (60%)"
+    assert "Present Simple — средний балл 60%" in weak
+    assert "Тестов пройдено: 1" in overall
+
+
+async def test_progress_report_for_new_user(monkeypatch):
+    async def no_sessions(user_id):
+        return []
+
+    async def no_progress(user_id):
+        return [], {"total_tests": 0, "avg_score": None,
+                    "total_questions_answered": None, "total_correct": None}
+
+    monkeypatch.setattr(progress_tracker, "get_user_sessions", no_sessions)
+    monkeypatch.setattr(progress_tracker, "get_topic_progress", no_progress)
+
+    history, weak, overall = await progress_tracker.format_progress_report(1)
+    assert history.startswith("📭")
+    assert weak == "" and overall == ""
+
+
+def test_history_uses_subject_icons():
+    sessions = [
+        {"language": lang, "topic": "T", "total_questions": 1, "correct_answers": 1, "score_percent": 100.0}
+        for lang in ("German", "Mathematics", "Chemistry")
+    ]
+    lines = progress_tracker._render_history(sessions).splitlines()[2:]
+    assert [line.split()[0] for line in lines] == ["🇩🇪", "📐", "📚"]
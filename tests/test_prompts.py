@@ -1,17 +1,37 @@
 """Tests for prompt building."""
 
-from llm.prompts import build_test_prompt
+from llm.prompts import build_test_prompt, build_test_system_prompt
 
 
 def test_math_prompt_mentions_only_math_subject():
-    prompt = build_test_prompt("Mathematics", "Линейные уравнения", 5, level="School")
+    prompt = build_test_system_prompt("Mathematics")
     assert "strictly for Mathematics" in prompt
     assert "В каком году началась Отечественная война" not in prompt
     assert "Какой орган перекачивает кровь" not in prompt
 
 
 def test_history_prompt_mentions_only_history_subject():
-    prompt = build_test_prompt("History", "История России XIX века", 5, level="School")
+    prompt = build_test_system_prompt("History")
     assert "strictly for History" in prompt
     assert "периметр квадрата" not in prompt
     assert "фотосинтез" not in prompt
+
+
+def test_system_prompt_is_static_per_language():
+    build_test_system_prompt.cache_clear()
+    first = build_test_system_prompt("English")
+    assert build_test_system_prompt("English") is first
+    assert build_test_system_prompt.cache_info().misses == 1
+    assert "from Russian to English" in first
+
+    # Topic, level and count live only in the per-request part
+    prompt = build_test_prompt("English", "Past Simple", 10, level="B1", previous_questions=["Q1"])
+    assert "Topic: Past Simple" in prompt and "Number of questions: 10" in prompt
+    assert "Past Simple" not in first
+    assert prompt.rstrip().endswith("Output ONLY the JSON array:")
+
+
+def test_task_prompt_numbers_previous_questions_from_one():
+    prompt = build_test_prompt("English", "Food", 5, level="Z9", previous_questions=["Q1", "Q2"])
+    assert "1. Q1\n2. Q2" in prompt
+    assert "Z9 - Z9 level student" in prompt
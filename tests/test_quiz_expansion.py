@@ -1,6 +1,6 @@
 ﻿"""Tests for v1.5.0 quiz expansion."""
 
-from keyboards.quiz_kb import language_keyboard
+from keyboards.quiz_kb import language_keyboard, multiple_choice_keyboard, topic_keyboard
 from handlers.import_questions import _validate_question
 from llm.parser import parse_questions
 from services.answer_checker import check_answer
@@ -29,6 +29,24 @@ def test_answer_checker_audio():
     assert check_answer(question, "legkie")
 
 
+def test_answer_checker_normalizes_correct_answers_once():
+    from services.answer_checker import _accepted_answers
+
+    question = {
+        "type": "fill_blank",
+        "question": "I ___ a cat",
+        "correct": "have",
+        "accept_also": ["has"],
+        "explanation": "ok",
+    }
+    _accepted_answers.cache_clear()
+    assert check_answer(question, "Have!")
+    assert check_answer(dict(question), "Have!")
+    # accept_also only applies to free-form types
+    assert not check_answer(question, "has")
+    assert _accepted_answers.cache_info().misses == 1
+
+
 def test_parser_accepts_matching_and_audio():
     raw = """
     [
@@ -92,3 +110,11 @@ def test_fallback_subject_pools_are_not_mixed():
     assert any("Patriotic War" in item["question"] for item in history)
     assert any("cell" in item["question"].lower() for item in biology)
     assert any("7 * 8" in item["question"] for item in math)
+
+
+def test_keyboards_are_built_once():
+    assert language_keyboard() is language_keyboard()
+    first = multiple_choice_keyboard(["a", "b", "c", "d", "extra"])
+    assert first is multiple_choice_keyboard(["a", "b", "c", "d"])
+    assert len(first.inline_keyboard) == 5  # 4 варианта + отмена
+    assert topic_keyboard("English", "A1") is topic_keyboard("English", "A1")
@@ -1,6 +1,7 @@
 """Tests for template fallback quiz generation."""
+import asyncio
 import importlib
-import pytest
+import sys
 
 
 def test_generate_fallback_questions_count_and_types():
@@ -20,7 +21,6 @@ def test_generate_fallback_questions_count_and_types():
         assert q.get("explanation")
 
 
-@pytest.mark.asyncio
 async def test_generate_test_uses_template_fallback_when_llm_unavailable(monkeypatch):
     monkeypatch.setenv("BOT_TOKEN", "123:abc")
     monkeypatch.setenv("ENCRYPTION_KEY", "AAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAA=")
@@ -41,3 +41,173 @@ async def test_generate_test_uses_template_fallback_when_llm_unavailable(monkeyp
     assert questions is not None
     assert len(questions) == 5
     assert all("type" in q for q in questions)
+
+
+async def test_generate_test_reuses_cached_llm_quiz(monkeypatch):
+    monkeypatch.setenv("BOT_TOKEN", "123:abc")
+    monkeypatch.setenv("ENCRYPTION_KEY", "AAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAA=")
+    test_generator = importlib.import_module("services.test_generator")
+    monkeypatch.setattr(test_generator, "_quiz_cache", {})
+
+    calls = []
+
+    async def _fake_chat_completion(*args, **kwargs):
+        calls.append(args)
+        return "raw"
+
+    generated = [
+        {"type": "multiple_choice", "question": f"Q{i}", "options": ["a", "b", "c", "d"],
+         "correct": "b", "explanation": "e"}
+        for i in range(3)
+    ]
+    monkeypatch.setattr(test_generator, "chat_completion", _fake_chat_completion)
+    monkeypatch.setattr(test_generator, "parse_questions", lambda raw: generated)
+
+    first = await test_generator.generate_test("English", "Topic", 3, user_id=None, level="A2")
+    second = await test_generator.generate_test("English", "Topic", 3, user_id=None, level="A2")
+
+    assert len(calls) == 1
+    assert {q["question"] for q in second} == {q["question"] for q in first}
+    for q in second:
+        assert sorted(q["options"]) == ["a", "b", "c", "d"]
+        assert q["correct"] == "b"
+
+    # Та же тема в другом написании попадает в тот же кэш
+    await test_generator.generate_test("English", "  topic ", 3, user_id=None, level="A2")
+    assert len(calls) == 1
+
+    # Другое число вопросов — другой ключ кэша
+    await test_generator.generate_test("English", "Topic", 2, user_id=None, level="A2")
+    assert len(calls) == 2
+
+
+async def test_generate_test_splits_large_quiz_into_parallel_calls(monkeypatch):
+    monkeypatch.setenv("BOT_TOKEN", "123:abc")
+    monkeypatch.setenv("ENCRYPTION_KEY", "AAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAA=")
+    test_generator = importlib.import_module("services.test_generator")
+    monkeypatch.setattr(test_generator, "_quiz_cache", {})
+
+    in_flight = 0
+    max_in_flight = 0
+
+    async def _fake_chat_completion(prompt, *args, **kwargs):
+        nonlocal in_flight, max_in_flight
+        in_flight += 1
+        max_in_flight = max(max_in_flight, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        return prompt
+
+    offsets = iter((0, 5))
+
+    def _fake_parse(raw):
+        # Каждая половина возвращает свои 5 вопросов
+        offset = next(offsets)
+        return [
+            {"type": "true_false", "question": f"Q{offset + i}", "correct": "True", "explanation": "e"}
+            for i in range(5)
+        ]
+
+    monkeypatch.setattr(test_generator, "chat_completion", _fake_chat_completion)
+    monkeypatch.setattr(test_generator, "parse_questions", _fake_parse)
+
+    questions = await test_generator.generate_test("English", "Big", 10, user_id=None, level="A2")
+
+    assert max_in_flight == 2
+    assert len(questions) == 10
+    assert len({q["question"] for q in questions}) == 10
+
+
+async def test_generate_test_speculative_retry_wins_over_slow_first_attempt(monkeypatch):
+    monkeypatch.setenv("BOT_TOKEN", "123:abc")
+    monkeypatch.setenv("ENCRYPTION_KEY", "AAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAA=")
+    test_generator = importlib.import_module("services.test_generator")
+    monkeypatch.setattr(test_generator, "_quiz_cache", {})
+    monkeypatch.setattr(test_generator.settings, "LLM_SPECULATIVE_RETRY", True)
+    monkeypatch.setattr(test_generator.settings, "LLM_SPECULATIVE_RETRY_DELAY", 0.01)
+
+    first_cancelled = asyncio.Event()
+
+    async def _fake_chat_completion(prompt, *args, **kwargs):
+        if test_generator._STRICT_SUFFIX in prompt:
+            return "retry"
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            first_cancelled.set()
+            raise
+        return "first"
+
+    def _fake_parse(raw):
+        return [
+            {"type": "true_false", "question": f"{raw} Q{i}", "correct": "True", "explanation": "e"}
+            for i in range(3)
+        ]
+
+    monkeypatch.setattr(test_generator, "chat_completion", _fake_chat_completion)
+    monkeypatch.setattr(test_generator, "parse_questions", _fake_parse)
+
+    questions = await asyncio.wait_for(
+        test_generator.generate_test("English", "Slow", 3, user_id=None, level="A2"), timeout=1,
+    )
+
+    assert [q["question"] for q in questions] == ["retry Q0", "retry Q1", "retry Q2"]
+    await asyncio.wait_for(first_cancelled.wait(), timeout=1)
+
+
+async def test_generate_test_reuses_quiz_persisted_before_restart(monkeypatch):
+    monkeypatch.setenv("BOT_TOKEN", "123:abc")
+    monkeypatch.setenv("ENCRYPTION_KEY", "AAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAA=")
+    test_generator = importlib.import_module("services.test_generator")
+    crud = importlib.import_module("database.crud")
+    monkeypatch.setattr(test_generator, "_quiz_cache", {})
+
+    stored = {}
+
+    async def _save(cache_key, questions, created_at):
+        stored[cache_key] = (created_at, questions)
+
+    async def _get(cache_key, max_age_seconds):
+        return stored.get(cache_key)
+
+    async def _no_imported(*args, **kwargs):
+        return []
+
+    async def _fake_chat_completion(*args, **kwargs):
+        return "raw"
+
+    generated = [
+        {"type": "true_false", "question": f"Q{i}", "correct": "True", "explanation": "e"}
+        for i in range(3)
+    ]
+    monkeypatch.setattr(crud, "save_cached_quiz", _save)
+    monkeypatch.setattr(crud, "get_cached_quiz", _get)
+    monkeypatch.setattr(crud, "get_imported_questions", _no_imported)
+    monkeypatch.setattr(test_generator, "chat_completion", _fake_chat_completion)
+    monkeypatch.setattr(test_generator, "parse_questions", lambda raw: generated)
+
+    await test_generator.generate_test("English", "Topic", 3, user_id=None, level="A2")
+    assert list(stored) == ["English|A2|topic|3"]
+
+    # Перезапуск: кэш в памяти пуст, тест берётся из БД без обращения к LLM
+    test_generator._quiz_cache.clear()
+    monkeypatch.setattr(test_generator, "chat_completion", None)
+    again = await test_generator.generate_test("English", "Topic", 3, user_id=None, level="A2")
+    assert {q["question"] for q in again} == {"Q0", "Q1", "Q2"}
+
+
+def test_topic_key_reuses_one_interned_object(monkeypatch):
+    monkeypatch.setenv("BOT_TOKEN", "123:abc")
+    monkeypatch.setenv("ENCRYPTION_KEY", "AAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAA=")
+    test_generator = importlib.import_module("services.test_generator")
+
+    first = test_generator._topic_key("Past Simple")
+    assert test_generator._topic_key(" past  SIMPLE ") is first
+    assert test_generator._topic_key("".join(["Past", " Simple"])) is first
+
+    # Порядок слов значим: это разные темы и разные записи кэша
+    assert test_generator._topic_key("Simple Past") != first
+    assert test_generator._topic_key("Past Simple?") != first
+
+    topic = test_generator.settings.TOPICS["English"]["A2"][1]
+    assert topic is sys.intern("".join(["Past", " Simple"]))
@@ -0,0 +1,304 @@
+"""Тесты прохождения квиза (handlers/quiz.py)."""
+import asyncio
+import json
+from unittest.mock import AsyncMock, MagicMock
+
+from aiogram.fsm.context import FSMContext
+from aiogram.fsm.storage.base import StorageKey
+from aiogram.fsm.storage.memory import MemoryStorage
+
+from handlers.quiz import (
+    _expand_answers, _process_answer, _send_current_question, _show_results, answer_via_button,
+    answer_via_text, start_quiz,
+)
+from services.gamification import get_theme
+from database import crud
+from states.quiz_states import QuizFlow
+
+QUESTIONS = (
+    {"type": "true_false", "question": "Q1", "correct": "True", "explanation": ""},
+    {"type": "true_false", "question": "Q2", "correct": "False", "explanation": ""},
+)
+
+
+async def test_process_answer_reads_state_once():
+    storage = MemoryStorage()
+    state = FSMContext(storage=storage, key=StorageKey(bot_id=1, chat_id=1, user_id=1))
+    await state.update_data(
+        questions=list(QUESTIONS), question_count=2, current_index=0,
+        correct_count=0, answers=[], answer_times=[],
+    )
+    storage.get_data = AsyncMock(wraps=storage.get_data)
+    message = MagicMock()
+    message.answer = AsyncMock()
+
+    await _process_answer(message, state, "True")
+    # Одно чтение в _process_answer и по одному внутри двух update_data;
+    # _send_current_question повторно состояние не читает
+    assert storage.get_data.await_count == 3
+
+    data = await state.get_data()
+    assert data["current_index"] == 1
+    assert data["correct_count"] == 1
+    # В состоянии хранится компактная запись (индекс, ответ, верно ли)
+    assert data["answers"] == [(0, "True", True)]
+    # Отзыв и следующий вопрос (по уже прочитанному состоянию) — одним сообщением
+    assert message.answer.await_count == 1
+    text = message.answer.await_args.args[0]
+    assert text.startswith(get_theme("neutral")["correct_msg"])
+    assert "Q2" in text
+
+
+async def test_unknown_question_types_are_skipped_in_one_write():
+    storage = MemoryStorage()
+    state = FSMContext(storage=storage, key=StorageKey(bot_id=1, chat_id=1, user_id=1))
+    questions = [
+        {"type": "essay", "question": "X1", "correct": "", "explanation": ""},
+        {"type": "essay", "question": "X2", "correct": "", "explanation": ""},
+        *QUESTIONS,
+    ]
+    await state.update_data(
+        questions=questions, question_count=4, current_index=0,
+        correct_count=0, answers=[], answer_times=[],
+    )
+    storage.set_data = AsyncMock(wraps=storage.set_data)
+    message = MagicMock()
+    message.answer = AsyncMock()
+
+    await _send_current_question(message, state)
+
+    assert storage.set_data.await_count == 1
+    assert (await state.get_data())["current_index"] == 2
+    assert message.answer.await_count == 1
+    assert "Q1" in message.answer.await_args.args[0]
+
+
+def test_expand_answers_restores_full_records():
+    answers = _expand_answers(list(QUESTIONS), [(1, "True", False)])
+    assert answers == [{
+        "question_type": "true_false",
+        "question_text": "Q2",
+        "correct_answer": "False",
+        "user_answer": "True",
+        "is_correct": False,
+        "explanation": "",
+    }]
+
+
+async def _answering_state(chat_id: int, questions: list[dict]) -> FSMContext:
+    state = FSMContext(storage=MemoryStorage(), key=StorageKey(bot_id=1, chat_id=chat_id, user_id=chat_id))
+    await state.set_state(QuizFlow.answering_question)
+    await state.update_data(
+        questions=questions, question_count=len(questions), current_index=0,
+        correct_count=0, answers=[], answer_times=[],
+    )
+    return state
+
+
+async def test_concurrent_answers_on_last_question_are_processed_once():
+    state = await _answering_state(2, [QUESTIONS[0]])
+    message = MagicMock()
+    message.chat.id = 2
+    message.text = "True"
+    message.answer = AsyncMock()
+
+    await asyncio.gather(answer_via_text(message, state), answer_via_text(message, state))
+
+    # Первый ответ завершил квиз, второй отброшен, а не упал на пустом состоянии
+    assert await state.get_state() is None
+    # Фидбек и итоги первого ответа, второй ответ ничего не отправил
+    assert message.answer.await_count == 2
+
+
+async def test_double_button_press_is_debounced():
+    state = await _answering_state(3, list(QUESTIONS))
+    callback = MagicMock()
+    callback.data = "ans:True"
+    callback.message.chat.id = 3
+    callback.message.answer = AsyncMock()
+    callback.answer = AsyncMock()
+
+    await answer_via_button(callback, state)
+    await answer_via_button(callback, state)
+
+    data = await state.get_data()
+    assert data["current_index"] == 1
+    assert callback.answer.call_args_list[-1].args == ("Ответ уже принят",)
+
+
+async def test_question_parts_are_prerendered_once():
+    state = await _answering_state(4, list(QUESTIONS))
+    message = MagicMock()
+    message.answer = AsyncMock()
+    message.bot.edit_message_reply_markup = AsyncMock()
+
+    await _send_current_question(message, state)
+    rendered = (await state.get_data())["rendered"]
+    assert [title for title, _ in rendered] == [
+        "❓ Вопрос 1/2 ░░░░░░░░░░ 0%\n",
+        "❓ Вопрос 2/2 ▓▓▓▓▓░░░░░ 50%\n",
+    ]
+    assert message.answer.await_args.args[0] == "❓ Вопрос 1/2 ░░░░░░░░░░ 0%\n✅ 0 правильных\n\nQ1"
+
+    await _process_answer(message, state, "True")
+    # Следующий вопрос отрисован из того же списка, а не построен заново
+    assert (await state.get_data())["rendered"] is rendered
+
+
+async def test_failed_callback_ack_does_not_block_answer():
+    state = await _answering_state(5, list(QUESTIONS))
+    callback = MagicMock()
+    callback.data = "ans:True"
+    callback.message.chat.id = 5
+    callback.message.answer = AsyncMock()
+    callback.answer = AsyncMock(side_effect=RuntimeError("query is too old"))
+
+    await answer_via_button(callback, state)
+    await asyncio.sleep(0)
+
+    # Подтверждение нажатия уходит в фоне: его ошибка только логируется
+    assert (await state.get_data())["current_index"] == 1
+
+
+async def test_answered_question_keyboard_is_removed():
+    state = await _answering_state(6, list(QUESTIONS))
+    message = MagicMock()
+    message.chat.id = 6
+    message.answer = AsyncMock(return_value=MagicMock(message_id=101))
+    message.bot.edit_message_reply_markup = AsyncMock()
+
+    await _send_current_question(message, state)
+    assert (await state.get_data())["last_question_msg_id"] == 101
+
+    await _process_answer(message, state, "True")
+
+    # Снятие клавиатуры дожидается вместе с ответом, а не остаётся висеть в фоне
+    message.bot.edit_message_reply_markup.assert_awaited_once_with(
+        chat_id=6, message_id=101, reply_markup=None,
+    )
+
+
+async def test_failed_keyboard_removal_does_not_break_answer():
+    state = await _answering_state(10, list(QUESTIONS))
+    message = MagicMock()
+    message.chat.id = 10
+    message.answer = AsyncMock(return_value=MagicMock(message_id=401))
+    message.bot.edit_message_reply_markup = AsyncMock(side_effect=RuntimeError("message to edit not found"))
+
+    await _send_current_question(message, state)
+    await _process_answer(message, state, "True")
+
+    data = await state.get_data()
+    assert data["current_index"] == 1
+    assert data["last_question_msg_id"] == 401
+
+
+async def test_second_quiz_in_chat_does_not_reuse_previous_rendering():
+    state = FSMContext(storage=MemoryStorage(), key=StorageKey(bot_id=1, chat_id=7, user_id=7))
+    message = MagicMock()
+    message.chat.id = 7
+    message.answer = AsyncMock(return_value=MagicMock(message_id=201))
+    message.bot.edit_message_reply_markup = AsyncMock()
+
+    # Старый квиз брошен на середине: из меню сразу начат новый, state.clear() не было
+    old_quiz = [
+        {"type": "true_false", "question": f"OLD QUIZ Q{i}", "correct": "True", "explanation": ""}
+        for i in range(1, 3)
+    ]
+    await state.update_data(questions=old_quiz, question_count=2, current_index=0, correct_count=0, answers=[])
+    await start_quiz(message, state)
+    await _process_answer(message, state, "False")
+
+    # Новый квиз длиннее старого — без сброса rendered[index] упал бы с IndexError
+    new_quiz = [
+        {"type": "multiple_choice", "question": f"NEW Q{i}", "options": ["a", "b", "c", "d"],
+         "correct": "a", "explanation": ""}
+        for i in range(1, 4)
+    ]
+    await state.update_data(questions=new_quiz, question_count=3, current_index=0, correct_count=0, answers=[])
+    message.answer.reset_mock()
+    await start_quiz(message, state)
+    for _ in range(2):
+        await _process_answer(message, state, "a")
+
+    texts = [call.args[0] for call in message.answer.await_args_list]
+    assert texts[0].startswith("❓ Вопрос 1/3") and texts[0].endswith("NEW Q1")
+    assert all("OLD QUIZ" not in text for text in texts)
+    assert "NEW Q3" in texts[-1]
+
+    # В состоянии только строки — его можно сериализовать для любого хранилища FSM
+    data = await state.get_data()
+    json.dumps(data["rendered"])
+    assert data["last_question_msg_id"] == 201
+
+
+async def test_results_are_sent_before_session_is_saved(monkeypatch):
+    state = await _answering_state(8, [QUESTIONS[0]])
+    await state.update_data(user_id=8, language="English", topic="Past Simple",
+                            correct_count=1, answers=[(0, "True", True)], current_index=1)
+    saved = asyncio.Event()
+    release = asyncio.Event()
+
+    async def _slow_save(*args, **kwargs):
+        await release.wait()
+        saved.set()
+        return 1
+
+    monkeypatch.setattr(crud, "save_test_session", _slow_save)
+    monkeypatch.setattr(crud, "ensure_user_stats", AsyncMock(return_value={}))
+    monkeypatch.setattr(crud, "update_user_stats", AsyncMock())
+    monkeypatch.setattr(crud, "get_user_badges", AsyncMock(return_value=[]))
+    # Сессия ещё не записана: в БД тестов нет, но первый тест уже засчитан
+    monkeypatch.setattr(crud, "get_stats_summary", AsyncMock(return_value={"total_tests": 0}))
+    monkeypatch.setattr(crud, "get_distinct_languages", AsyncMock(return_value=1))
+    monkeypatch.setattr(crud, "get_distinct_topics", AsyncMock(return_value=1))
+    award = AsyncMock()
+    monkeypatch.setattr(crud, "award_badges", award)
+
+    message = MagicMock()
+    sent_before_save = []
+    message.answer = AsyncMock(side_effect=lambda *a, **k: sent_before_save.append(not saved.is_set()))
+
+    show = asyncio.create_task(_show_results(message, state))
+    await asyncio.sleep(0.01)
+    assert sent_before_save == [True]
+    assert not show.done()
+
+    release.set()
+    await show
+    assert saved.is_set()
+    assert "first_quiz" in award.await_args.args[1]
+
+
+async def test_late_press_on_previous_question_keyboard_is_ignored(monkeypatch):
+    state = await _answering_state(9, list(QUESTIONS) + [QUESTIONS[0]])
+    message = MagicMock()
+    message.chat.id = 9
+    message.answer = AsyncMock(return_value=MagicMock(message_id=301))
+    message.bot.edit_message_reply_markup = AsyncMock()
+    await _send_current_question(message, state)
+
+    def _press(message_id, answer):
+        callback = MagicMock()
+        callback.data = f"ans:{answer}"
+        callback.message.chat.id = 9
+        callback.message.message_id = message_id
+        callback.message.answer = AsyncMock(return_value=MagicMock(message_id=302))
+        callback.message.bot.edit_message_reply_markup = AsyncMock()
+        callback.answer = AsyncMock()
+        return callback
+
+    await answer_via_button(_press(301, "True"), state)
+    assert (await state.get_data())["last_question_msg_id"] == 302
+
+    # Кнопку первого вопроса нажали уже после антидребезга: ответ не засчитывается второму
+    monkeypatch.setattr("handlers.quiz.ANSWER_DEBOUNCE_SECONDS", 0)
+    late = _press(301, "True")
+    await answer_via_button(late, state)
+    data = await state.get_data()
+    assert data["current_index"] == 1
+    assert len(data["answers"]) == 1
+    late.message.answer.assert_not_awaited()
+
+    await answer_via_button(_press(302, "False"), state)
+    assert (await state.get_data())["current_index"] == 2
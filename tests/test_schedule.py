@@ -3,13 +3,17 @@ import pytest
 from datetime import date, datetime, timedelta
 from unittest.mock import AsyncMock, MagicMock, patch
 
+import handlers.schedule as schedule_module
 from mesh_api.models import Lesson
 from mesh_api.exceptions import AuthenticationError, MeshAPIError
 from handlers.schedule import (
+    _esc,
     _format_day_schedule,
     _format_week_schedule,
     _parse_callback_data,
     _get_week_dates,
+    _fetch_week_schedule,
+    _get_schedule_text,
     cmd_raspisanie,
     _handle_schedule_request,
 )
@@ -97,6 +101,13 @@ class TestFormatDaySchedule:
         assert "&lt;301&gt;" in result
         assert "<углублённая>" not in result
 
+    def test_esc_fast_path_returns_same_object(self):
+        """Строка без спецсимволов возвращается как есть, без копирования."""
+        subject = "Математика"
+        assert _esc(subject) is subject
+        assert _esc("a'b\"c") == "a&#x27;b&quot;c"
+        assert _esc(None) == ""
+
 
 class TestFormatWeekSchedule:
     """Тесты форматирования расписания на неделю."""
@@ -147,6 +158,34 @@ class TestFormatWeekSchedule:
         assert result is None
 
 
+class TestFetchWeekSchedule:
+    """Тесты параллельной загрузки расписания на неделю."""
+
+    async def test_fetch_week_partial_failure(self, today, sample_lessons):
+        """Все 5 дней запрашиваются; упавший день помечается, остальные показаны."""
+        client = AsyncMock()
+        client.get_schedule.side_effect = [
+            sample_lessons, MeshAPIError("down"), [], sample_lessons, sample_lessons,
+        ]
+
+        result = await _fetch_week_schedule(client, 100, today, "tok", person_id="p")
+
+        assert client.get_schedule.await_count == 5
+        assert "Не удалось загрузить" in result
+        assert "24 февраля (вторник)" in result
+        assert "Математика" in result
+
+    async def test_fetch_week_auth_error_propagates(self, today, sample_lessons):
+        """AuthenticationError любого дня пробрасывается наверх."""
+        client = AsyncMock()
+        client.get_schedule.side_effect = [
+            sample_lessons, sample_lessons, AuthenticationError("401"), [], [],
+        ]
+
+        with pytest.raises(AuthenticationError):
+            await _fetch_week_schedule(client, 100, today, "tok", person_id="p")
+
+
 # ============================================================================
 # ТЕСТЫ ПАРСИНГА CALLBACK DATA
 # ============================================================================
@@ -155,25 +194,24 @@ class TestFormatWeekSchedule:
 class TestParseCallbackData:
     """Тесты парсинга callback_data."""
 
-    def test_parse_callback_valid(self):
-        """Валидный callback 'sched:period:123:today' — корректный кортеж."""
-        result = _parse_callback_data("sched:period:123:today")
-        assert result == ("period", 123, "today")
-
-    def test_parse_callback_no_extra(self):
-        """Callback без extra 'sched:child:123' — extra=None."""
-        result = _parse_callback_data("sched:child:123")
-        assert result == ("child", 123, None)
-
-    def test_parse_callback_malformed(self):
-        """Невалидный callback 'invalid' — None."""
-        result = _parse_callback_data("invalid")
-        assert result is None
-
-    def test_parse_callback_bad_student_id(self):
-        """Нечисловой student_id 'sched:child:abc' — None."""
-        result = _parse_callback_data("sched:child:abc")
-        assert result is None
+    @pytest.mark.parametrize(
+        "data, expected",
+        [
+            ("sched:period:123:today", ("period", 123, "today")),
+            ("sched:child:123", ("child", 123, None)),
+            ("invalid", None),
+            ("sched:child:abc", None),
+            ("sched:child:", None),
+            ("other:child:123", None),
+        ],
+        ids=[
+            "valid", "no_extra", "malformed",
+            "bad_student_id", "empty_student_id", "foreign_prefix",
+        ],
+    )
+    def test_parse_callback_data(self, data, expected):
+        """Валидный callback — кортеж (extra=None без хвоста), невалидный — None."""
+        assert _parse_callback_data(data) == expected
 
 
 # ============================================================================
@@ -184,28 +222,14 @@ class TestParseCallbackData:
 class TestGetWeekDates:
     """Тесты получения дат Пн-Пт текущей недели."""
 
-    def test_get_week_dates_monday(self):
-        """Из понедельника — Пн-Пт той же недели."""
-        monday = date(2026, 2, 23)
-        result = _get_week_dates(monday)
-
-        assert len(result) == 5
-        assert result[0] == date(2026, 2, 23)
-        assert result[4] == date(2026, 2, 27)
-
-    def test_get_week_dates_wednesday(self):
-        """Из среды — Пн-Пт той же недели."""
-        wednesday = date(2026, 2, 25)
-        result = _get_week_dates(wednesday)
-
-        assert len(result) == 5
-        assert result[0] == date(2026, 2, 23)
-        assert result[4] == date(2026, 2, 27)
-
-    def test_get_week_dates_sunday(self):
-        """Из воскресенья — Пн-Пт той же недели."""
-        sunday = date(2026, 3, 1)
-        result = _get_week_dates(sunday)
+    @pytest.mark.parametrize(
+        "day",
+        [date(2026, 2, 23), date(2026, 2, 25), date(2026, 3, 1)],
+        ids=["monday", "wednesday", "sunday"],
+    )
+    def test_get_week_dates(self, day):
+        """Из любого дня недели — Пн-Пт той же недели."""
+        result = _get_week_dates(day)
 
         assert len(result) == 5
         assert result[0] == date(2026, 2, 23)
@@ -217,37 +241,40 @@ class TestGetWeekDates:
 # ============================================================================
 
 
-def _make_user_dict(token: str = "old_token", expires_at: str = None) -> dict:
-    """Создаёт словарь пользователя для моков ensure_token."""
-    return {
-        "user_id": 12345,
-        "mesh_login": "login",
-        "mesh_password": "pass",
-        "mesh_token": token,
-        "token_expires_at": expires_at,
-        "mesh_refresh_token": None,
-        "mesh_client_id": None,
-        "mesh_client_secret": None,
-    }
+@pytest.fixture
+def frozen_now(monkeypatch):
+    """Фиксирует datetime.now() в token_manager на 2026-02-25 12:00."""
+
+    class _FrozenDatetime(datetime):
+        @classmethod
+        def now(cls, tz=None):
+            return datetime(2026, 2, 25, 12, 0, 0)
+
+    monkeypatch.setattr("utils.token_manager.datetime", _FrozenDatetime)
 
 
 class TestTokenManager:
     """Тесты менеджера токенов (ensure_token + _is_token_valid)."""
 
-    def setup_method(self):
-        """Очищаем _token_locks между тестами, чтобы не было shared state."""
-        from utils.token_manager import _token_locks
+    @pytest.fixture(autouse=True)
+    def _clear_token_state(self):
+        """Очищаем локи и кэш токенов до и после теста, чтобы не было shared state."""
+        from utils.token_manager import _token_cache, _token_locks
+        _token_locks.clear()
+        _token_cache.clear()
+        yield
         _token_locks.clear()
+        _token_cache.clear()
 
     @patch("utils.token_manager.update_user_token", new_callable=AsyncMock)
     @patch("utils.token_manager.MeshAuth")
     @patch("utils.token_manager.get_user", new_callable=AsyncMock)
     async def test_token_valid_no_refresh(
-        self, mock_get_user, mock_mesh_auth_cls, mock_update_token
+        self, mock_get_user, mock_mesh_auth_cls, mock_update_token, make_user_dict
     ):
         """Токен ещё действителен — возвращается без вызова API."""
         future_time = (datetime.now() + timedelta(hours=1)).isoformat()
-        mock_get_user.return_value = _make_user_dict("existing_token", future_time)
+        mock_get_user.return_value = make_user_dict("existing_token", future_time)
 
         result = await ensure_token(12345)
 
@@ -255,15 +282,30 @@ class TestTokenManager:
         mock_mesh_auth_cls.assert_not_called()
         mock_update_token.assert_not_called()
 
+    @patch("utils.token_manager.get_user", new_callable=AsyncMock)
+    async def test_valid_token_served_from_memory(self, mock_get_user, make_user_dict):
+        """Повторный вызов с действующим токеном не ходит в БД; сброс кэша — ходит."""
+        from utils.token_manager import forget_cached_token
+        future_time = (datetime.now() + timedelta(hours=1)).isoformat()
+        mock_get_user.return_value = make_user_dict("existing_token", future_time)
+
+        assert await ensure_token(12345) == "existing_token"
+        assert await ensure_token(12345) == "existing_token"
+        mock_get_user.assert_awaited_once()
+
+        forget_cached_token(12345)
+        assert await ensure_token(12345) == "existing_token"
+        assert mock_get_user.await_count == 2
+
     @patch("utils.token_manager.update_user_token", new_callable=AsyncMock)
     @patch("utils.token_manager.MeshAuth")
     @patch("utils.token_manager.get_user", new_callable=AsyncMock)
     async def test_token_expired_refresh(
-        self, mock_get_user, mock_mesh_auth_cls, mock_update_token
+        self, mock_get_user, mock_mesh_auth_cls, mock_update_token, make_user_dict
     ):
         """Токен истёк и есть OAuth-данные — выполняется refresh без повторного логина."""
         past_time = (datetime.now() - timedelta(hours=1)).isoformat()
-        user = _make_user_dict("old_token", past_time)
+        user = make_user_dict("old_token", past_time)
         user["mesh_refresh_token"] = "refresh"
         user["mesh_client_id"] = "client_id"
         user["mesh_client_secret"] = "client_secret"
@@ -288,10 +330,10 @@ class TestTokenManager:
     @patch("utils.token_manager.MeshAuth")
     @patch("utils.token_manager.get_user", new_callable=AsyncMock)
     async def test_token_none_refresh(
-        self, mock_get_user, mock_mesh_auth_cls, mock_update_token
+        self, mock_get_user, mock_mesh_auth_cls, mock_update_token, make_user_dict
     ):
         """token_expires_at=None и есть OAuth-данные — выполняется refresh."""
-        user = _make_user_dict("old_token", None)
+        user = make_user_dict("old_token", None)
         user["mesh_refresh_token"] = "refresh"
         user["mesh_client_id"] = "client_id"
         user["mesh_client_secret"] = "client_secret"
@@ -311,11 +353,11 @@ class TestTokenManager:
     @patch("utils.token_manager.MeshAuth")
     @patch("utils.token_manager.get_user", new_callable=AsyncMock)
     async def test_token_without_oauth_data_reused_after_local_expiry(
-        self, mock_get_user, mock_mesh_auth_cls, mock_update_token
+        self, mock_get_user, mock_mesh_auth_cls, mock_update_token, make_user_dict
     ):
         """Токен без OAuth-данных не переавторизуется по локальному 24h-таймеру."""
         past_time = (datetime.now() - timedelta(days=3)).isoformat()
-        mock_get_user.return_value = _make_user_dict("existing_token", past_time)
+        mock_get_user.return_value = make_user_dict("existing_token", past_time)
 
         result = await ensure_token(12345)
 
@@ -326,10 +368,10 @@ class TestTokenManager:
     @patch("utils.token_manager.MeshAuth")
     @patch("utils.token_manager.get_user", new_callable=AsyncMock)
     async def test_token_without_oauth_data_after_forced_invalidation_requires_manual_reregister(
-        self, mock_get_user, mock_mesh_auth_cls
+        self, mock_get_user, mock_mesh_auth_cls, make_user_dict
     ):
         """После реального 401 fallback-токен больше не вызывает скрытый SMS-вход."""
-        mock_get_user.return_value = _make_user_dict(
+        mock_get_user.return_value = make_user_dict(
             "existing_token",
             "2000-01-01T00:00:00",
         )
@@ -342,11 +384,11 @@ class TestTokenManager:
     @patch("utils.token_manager.MeshAuth")
     @patch("utils.token_manager.get_user", new_callable=AsyncMock)
     async def test_token_refresh_failure(
-        self, mock_get_user, mock_mesh_auth_cls
+        self, mock_get_user, mock_mesh_auth_cls, make_user_dict
     ):
         """Если refresh не удался, а логин тоже падает — ошибка пробрасывается наверх."""
         past_time = (datetime.now() - timedelta(hours=1)).isoformat()
-        user = _make_user_dict("old_token", past_time)
+        user = make_user_dict("old_token", past_time)
         user["mesh_refresh_token"] = "refresh"
         user["mesh_client_id"] = "client_id"
         user["mesh_client_secret"] = "client_secret"
@@ -369,35 +411,69 @@ class TestTokenManager:
         with pytest.raises(AuthenticationError, match="не зарегистрирован"):
             await ensure_token(99999)
 
-    @patch("utils.token_manager.datetime")
-    def test_token_buffer_edge(self, mock_datetime):
-        """Токен истекает через 4 минуты (в пределах 5-мин буфера) — невалиден."""
-        fixed_now = datetime(2026, 2, 25, 12, 0, 0)
-        mock_datetime.now.return_value = fixed_now
-        mock_datetime.fromisoformat = datetime.fromisoformat
+    async def test_token_locks_bounded(self, monkeypatch):
+        """Кэш локов ограничен: вытесняются самые старые свободные локи, занятые остаются."""
+        from utils import token_manager
+        monkeypatch.setattr(token_manager, "TOKEN_LOCK_CACHE_MAX", 2)
 
-        expires_at = "2026-02-25T12:04:00"
-        assert _is_token_valid(expires_at) is False
+        held = token_manager._get_lock(1)
+        await held.acquire()
+        token_manager._get_lock(2)
+        token_manager._get_lock(3)
+        token_manager._get_lock(4)
+        held.release()
 
-    @patch("utils.token_manager.datetime")
-    def test_token_valid_outside_buffer(self, mock_datetime):
-        """Токен истекает через 10 минут (за пределами буфера) — валиден."""
-        fixed_now = datetime(2026, 2, 25, 12, 0, 0)
-        mock_datetime.now.return_value = fixed_now
-        mock_datetime.fromisoformat = datetime.fromisoformat
+        assert list(token_manager._token_locks) == [1, 4]
 
-        expires_at = "2026-02-25T12:10:00"
-        assert _is_token_valid(expires_at) is True
+    @patch("utils.token_manager.update_user_token", new_callable=AsyncMock)
+    @patch("utils.token_manager.MeshAuth")
+    @patch("utils.token_manager.get_user", new_callable=AsyncMock)
+    async def test_concurrent_refresh_shares_one_lock(
+        self, mock_get_user, mock_mesh_auth_cls, mock_update_token, make_user_dict
+    ):
+        """Параллельные вызовы одного пользователя делят один лок: refresh не идут внахлёст."""
+        import asyncio
+        from utils import token_manager
+        past_time = (datetime.now() - timedelta(hours=1)).isoformat()
+        user = make_user_dict("old_token", past_time)
+        user.update(
+            mesh_refresh_token="refresh", mesh_client_id="id", mesh_client_secret="secret"
+        )
+        mock_get_user.return_value = user
+        in_flight = 0
+        max_in_flight = 0
+
+        async def slow_refresh(**_kwargs):
+            nonlocal in_flight, max_in_flight
+            in_flight += 1
+            max_in_flight = max(max_in_flight, in_flight)
+            await asyncio.sleep(0)
+            in_flight -= 1
+            return {"token": "new_token"}
 
-    @patch("utils.token_manager.datetime")
-    def test_token_exact_buffer_boundary(self, mock_datetime):
-        """Токен истекает ровно через 5 минут (граница буфера) — невалиден (strict >)."""
-        fixed_now = datetime(2026, 2, 25, 12, 0, 0)
-        mock_datetime.now.return_value = fixed_now
-        mock_datetime.fromisoformat = datetime.fromisoformat
+        mock_mesh_auth_cls.do_refresh_token = AsyncMock(side_effect=slow_refresh)
 
-        expires_at = "2026-02-25T12:05:00"
-        assert _is_token_valid(expires_at) is False
+        results = await asyncio.gather(*(ensure_token(12345) for _ in range(5)))
+
+        assert results == ["new_token"] * 5
+        assert list(token_manager._token_locks) == [12345]
+        assert max_in_flight == 1
+        # Ожидавшие лок берут обновлённый токен из кэша — один refresh и одно чтение БД
+        mock_mesh_auth_cls.do_refresh_token.assert_awaited_once()
+        mock_get_user.assert_awaited_once()
+
+    @pytest.mark.parametrize(
+        "expires_at, expected",
+        [
+            ("2026-02-25T12:04:00", False),
+            ("2026-02-25T12:10:00", True),
+            ("2026-02-25T12:05:00", False),
+        ],
+        ids=["inside_buffer", "outside_buffer", "exact_boundary"],
+    )
+    def test_token_buffer(self, frozen_now, expires_at, expected):
+        """5-минутный буфер: внутри и на границе (strict >) — невалиден, за пределами — валиден."""
+        assert _is_token_valid(expires_at) is expected
 
 
 # ============================================================================
@@ -405,53 +481,50 @@ class TestTokenManager:
 # ============================================================================
 
 
-def _make_mock_message(user_id: int = 12345) -> AsyncMock:
-    """Создаёт мок объекта Message."""
-    message = AsyncMock()
-    message.from_user = MagicMock()
-    message.from_user.id = user_id
-    message.answer = AsyncMock()
-    return message
+@pytest.fixture
+def mesh_client_mock(monkeypatch):
+    """Подменяет MeshClient в handlers.schedule; тест настраивает только get_schedule."""
+    client = AsyncMock()
+    client.__aenter__.return_value = client
+    monkeypatch.setattr("handlers.schedule.MeshClient", MagicMock(return_value=client))
+    return client
 
 
-def _make_mock_callback(
-    user_id: int = 12345, data: str = "sched:child:100"
-) -> AsyncMock:
-    """Создаёт мок объекта CallbackQuery."""
-    callback = AsyncMock()
-    callback.from_user = MagicMock()
-    callback.from_user.id = user_id
-    callback.data = data
-    callback.message = AsyncMock()
-    callback.message.edit_text = AsyncMock()
-    callback.answer = AsyncMock()
-    return callback
+@pytest.fixture
+def registered_env(monkeypatch, mesh_client_mock, sample_user, sample_children, make_message):
+    """Зарегистрированный пользователь с одним ребёнком и выданным токеном.
+
+    Возвращает (message, client); тест настраивает только расходящуюся ветку.
+    """
+    monkeypatch.setattr("handlers.schedule.get_user", AsyncMock(return_value=sample_user))
+    monkeypatch.setattr(
+        "handlers.schedule.get_user_children", AsyncMock(return_value=sample_children)
+    )
+    monkeypatch.setattr("handlers.schedule.ensure_token", AsyncMock(return_value="valid_token"))
+    return make_message(), mesh_client_mock
 
 
 class TestCmdRaspisanie:
     """Тесты обработчика команды /raspisanie."""
 
-    @patch("handlers.schedule.get_user", new_callable=AsyncMock)
-    async def test_cmd_unregistered_user(self, mock_get_user):
+    async def test_cmd_unregistered_user(self, monkeypatch, make_message):
         """Незарегистрированный пользователь — сообщение 'Сначала зарегистрируйтесь'."""
-        mock_get_user.return_value = None
-        message = _make_mock_message()
+        get_user = AsyncMock(return_value=None)
+        monkeypatch.setattr("handlers.schedule.get_user", get_user)
+        message = make_message()
 
         await cmd_raspisanie(message)
 
-        mock_get_user.assert_awaited_once_with(12345)
+        get_user.assert_awaited_once_with(12345)
         message.answer.assert_awaited_once()
         call_text = message.answer.call_args[0][0]
         assert "не зарегистрированы" in call_text.lower()
 
-    @patch("handlers.schedule.get_user_children", new_callable=AsyncMock)
-    @patch("handlers.schedule.get_user", new_callable=AsyncMock)
-    async def test_cmd_no_children(self, mock_get_user, mock_get_children, sample_user):
+    async def test_cmd_no_children(self, monkeypatch, sample_user, make_message):
         """Зарегистрированный пользователь без детей — сообщение 'нет привязанных детей'."""
-        mock_get_user.return_value = sample_user
-        mock_get_children.return_value = []
-
-        message = _make_mock_message()
+        monkeypatch.setattr("handlers.schedule.get_user", AsyncMock(return_value=sample_user))
+        monkeypatch.setattr("handlers.schedule.get_user_children", AsyncMock(return_value=[]))
+        message = make_message()
 
         await cmd_raspisanie(message)
 
@@ -459,30 +532,10 @@ class TestCmdRaspisanie:
         call_text = message.answer.call_args[0][0]
         assert "нет привязанных детей" in call_text.lower()
 
-    @patch("handlers.schedule.MeshClient")
-    @patch("handlers.schedule.ensure_token", new_callable=AsyncMock)
-    @patch("handlers.schedule.get_user_children", new_callable=AsyncMock)
-    @patch("handlers.schedule.get_user", new_callable=AsyncMock)
-    async def test_cmd_single_child(
-        self,
-        mock_get_user,
-        mock_get_children,
-        mock_ensure_token,
-        mock_mesh_client_cls,
-        sample_user,
-        sample_children,
-        sample_lessons,
-    ):
+    async def test_cmd_single_child(self, registered_env, sample_lessons):
         """Один ребёнок — расписание показывается сразу с содержимым."""
-        mock_get_user.return_value = sample_user
-        mock_get_children.return_value = sample_children
-        mock_ensure_token.return_value = "valid_token"
-
-        mock_client = AsyncMock()
-        mock_client.get_schedule.return_value = sample_lessons
-        mock_mesh_client_cls.return_value = mock_client
-
-        message = _make_mock_message()
+        message, client = registered_env
+        client.get_schedule.return_value = sample_lessons
 
         await cmd_raspisanie(message)
 
@@ -492,21 +545,29 @@ class TestCmdRaspisanie:
         assert call_kwargs.kwargs.get("reply_markup") is not None
         call_text = call_kwargs[0][0]
         assert "Математика" in call_text
+        schedule_module.MeshClient.assert_called_once()
+        client.__aexit__.assert_awaited_once()
+
+    async def test_week_uses_single_client(self, mesh_client_mock, sample_lessons):
+        """Неделя — один MeshClient на все 5 запросов, закрывается после загрузки."""
+        mesh_client_mock.get_schedule.return_value = sample_lessons
+
+        text, _ = await _get_schedule_text(100, "week", "tok", person_id="p")
+
+        assert "Математика" in text
+        schedule_module.MeshClient.assert_called_once()
+        assert mesh_client_mock.get_schedule.await_count == 5
+        mesh_client_mock.__aexit__.assert_awaited_once()
 
-    @patch("handlers.schedule.get_user_children", new_callable=AsyncMock)
-    @patch("handlers.schedule.get_user", new_callable=AsyncMock)
     async def test_cmd_multiple_children(
-        self,
-        mock_get_user,
-        mock_get_children,
-        sample_user,
-        multiple_children,
+        self, monkeypatch, sample_user, multiple_children, make_message
     ):
         """Несколько детей — показывается клавиатура выбора ребёнка."""
-        mock_get_user.return_value = sample_user
-        mock_get_children.return_value = multiple_children
-
-        message = _make_mock_message()
+        monkeypatch.setattr("handlers.schedule.get_user", AsyncMock(return_value=sample_user))
+        monkeypatch.setattr(
+            "handlers.schedule.get_user_children", AsyncMock(return_value=multiple_children)
+        )
+        message = make_message()
 
         await cmd_raspisanie(message)
 
@@ -517,53 +578,25 @@ class TestCmdRaspisanie:
         keyboard = call_kwargs.kwargs.get("reply_markup")
         assert keyboard is not None
 
-    @patch("handlers.schedule.MeshClient")
-    @patch("handlers.schedule.ensure_token", new_callable=AsyncMock)
-    @patch("handlers.schedule.get_user_children", new_callable=AsyncMock)
-    @patch("handlers.schedule.get_user", new_callable=AsyncMock)
-    async def test_cmd_api_error(
-        self,
-        mock_get_user,
-        mock_get_children,
-        mock_ensure_token,
-        mock_mesh_client_cls,
-        sample_user,
-        sample_children,
-    ):
+    async def test_cmd_api_error(self, registered_env):
         """MeshAPIError — сообщение 'Сервис МЭШ временно недоступен' + кнопка повтора."""
-        mock_get_user.return_value = sample_user
-        mock_get_children.return_value = sample_children
-        mock_ensure_token.return_value = "valid_token"
-
-        mock_client = AsyncMock()
-        mock_client.get_schedule.side_effect = MeshAPIError("API down")
-        mock_mesh_client_cls.return_value = mock_client
-
-        message = _make_mock_message()
+        message, client = registered_env
+        client.get_schedule.side_effect = MeshAPIError("API down")
 
         await cmd_raspisanie(message)
 
         message.answer.assert_awaited()
         call_text = message.answer.call_args[0][0]
         assert "временно недоступен" in call_text
+        schedule_module.MeshClient.assert_called_once()
 
-    @patch("handlers.schedule.ensure_token", new_callable=AsyncMock)
-    @patch("handlers.schedule.get_user_children", new_callable=AsyncMock)
-    @patch("handlers.schedule.get_user", new_callable=AsyncMock)
-    async def test_cmd_auth_error(
-        self,
-        mock_get_user,
-        mock_get_children,
-        mock_ensure_token,
-        sample_user,
-        sample_children,
-    ):
+    async def test_cmd_auth_error(self, monkeypatch, registered_env):
         """AuthenticationError от ensure_token — сообщение с текстом ошибки."""
-        mock_get_user.return_value = sample_user
-        mock_get_children.return_value = sample_children
-        mock_ensure_token.side_effect = AuthenticationError("Auth failed")
-
-        message = _make_mock_message()
+        message, _ = registered_env
+        monkeypatch.setattr(
+            "handlers.schedule.ensure_token",
+            AsyncMock(side_effect=AuthenticationError("Auth failed")),
+        )
 
         await cmd_raspisanie(message)
 
@@ -580,17 +613,16 @@ class TestCmdRaspisanie:
 class TestIDORProtection:
     """Тест защиты от IDOR — подмены student_id в callback_data."""
 
-    @patch("handlers.schedule.ensure_token", new_callable=AsyncMock)
-    @patch("handlers.schedule.get_user_children", new_callable=AsyncMock)
-    async def test_ownership_check(
-        self, mock_get_children, mock_ensure_token, sample_children
-    ):
+    async def test_ownership_check(self, monkeypatch, sample_children, make_callback):
         """Callback с чужим student_id — молча игнорируется, ensure_token не вызывается."""
-        mock_get_children.return_value = sample_children
-
-        callback = _make_mock_callback(user_id=12345)
+        ensure_token_mock = AsyncMock()
+        monkeypatch.setattr(
+            "handlers.schedule.get_user_children", AsyncMock(return_value=sample_children)
+        )
+        monkeypatch.setattr("handlers.schedule.ensure_token", ensure_token_mock)
+        callback = make_callback(user_id=12345)
 
         await _handle_schedule_request(callback, student_id=999, period="today")
 
         callback.message.edit_text.assert_not_awaited()
-        mock_ensure_token.assert_not_awaited()
+        ensure_token_mock.assert_not_awaited()
@@ -1,8 +1,6 @@
 """Tests for social features helper logic."""
 from datetime import date
 
-import pytest
-
 from handlers.social import _week_bounds, _format_shared_result_text, _build_admin_social_report
 
 
@@ -31,7 +29,6 @@ def test_format_shared_result_text_contains_main_fields():
     assert "8/10" in text
 
 
-@pytest.mark.asyncio
 async def test_build_admin_social_report(monkeypatch):
     async def fake_xp(limit=10):
         return [
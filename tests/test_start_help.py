@@ -1,12 +1,9 @@
 """Tests for /help command rendering."""
 from unittest.mock import AsyncMock
 
-import pytest
-
 from handlers.start import cmd_help
 
 
-@pytest.mark.asyncio
 async def test_cmd_help_escapes_share_token(monkeypatch):
     async def fake_role(_user_id: int):
         return "student"
@@ -1,5 +1,4 @@
 """Tests for STT transcription fallback logic in llm/client.py."""
-import pytest
 
 from config import settings
 from llm import client
@@ -9,7 +8,6 @@ def test_get_last_stt_error_accessor():
     assert client.get_last_stt_error() is None or isinstance(client.get_last_stt_error(), str)
 
 
-@pytest.mark.asyncio
 async def test_transcribe_audio_tries_direct_after_bridge_failure(monkeypatch):
     monkeypatch.setattr(settings, "STT_ENABLED", True)
     monkeypatch.setattr(settings, "LLM_BRIDGE_URL", "https://bridge.example/v1")
@@ -34,7 +32,6 @@ async def test_transcribe_audio_tries_direct_after_bridge_failure(monkeypatch):
     ]
 
 
-@pytest.mark.asyncio
 async def test_transcribe_audio_respects_disabled_flag(monkeypatch):
     monkeypatch.setattr(settings, "STT_ENABLED", False)
     result = await client.transcribe_audio_bytes(b"fake-audio")
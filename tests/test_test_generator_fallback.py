@@ -1,11 +1,9 @@
 """Tests for template fallback in services/test_generator.py."""
-import pytest
 
 from config import settings
 from services import test_generator
 
 
-@pytest.mark.asyncio
 async def test_generate_test_uses_fallback_when_llm_unavailable(monkeypatch):
     monkeypatch.setattr(settings, "LLM_FALLBACK_ENABLED", True)
 
@@ -28,7 +26,6 @@ async def test_generate_test_uses_fallback_when_llm_unavailable(monkeypatch):
     assert all(q.get("question", "").startswith("[Fallback | A2 | Present Simple]") for q in questions)
 
 
-@pytest.mark.asyncio
 async def test_generate_test_returns_none_when_fallback_disabled(monkeypatch):
     monkeypatch.setattr(settings, "LLM_FALLBACK_ENABLED", False)
 
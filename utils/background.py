@@ -0,0 +1,28 @@
+"""Fire-and-forget задачи, на которые держится ссылка до завершения."""
+import asyncio
+import logging
+from collections.abc import Coroutine
+
+logger = logging.getLogger(__name__)
+
+# Без сильной ссылки незавершённую задачу может собрать GC
+_background_tasks: set[asyncio.Task] = set()
+
+
+def _on_done(task: asyncio.Task) -> None:
+    _background_tasks.discard(task)
+    if not task.cancelled() and task.exception() is not None:
+        logger.warning("Background task failed: %r", task.exception())
+
+
+def run_in_background(coro: Coroutine) -> asyncio.Task:
+    """
+    Запустить корутину, не дожидаясь её.
+
+    Ошибка задачи логируется, а не теряется; при необходимости задачу
+    можно дождаться через возвращённый Task.
+    """
+    task = asyncio.create_task(coro)
+    _background_tasks.add(task)
+    task.add_done_callback(_on_done)
+    return task
@@ -1,7 +1,9 @@
 """Token manager for safe MeSH session reuse and refresh."""
 import asyncio
 import logging
+from collections import OrderedDict
 from datetime import datetime, timedelta
+from functools import lru_cache
 from typing import Optional
 
 from database.crud import get_user, update_user_token
@@ -12,8 +14,58 @@ logger = logging.getLogger(__name__)
 
 TOKEN_EXPIRY_BUFFER_MINUTES = 5
 FORCED_INVALIDATION_SENTINEL = "2000-01-01T00:00:00"
+_EXPIRY_BUFFER = timedelta(minutes=TOKEN_EXPIRY_BUFFER_MINUTES)
 
-_token_locks: dict[int, asyncio.Lock] = {}
+# Per-user locks are kept in a bounded LRU so churned users do not leak locks forever.
+TOKEN_LOCK_CACHE_MAX = 1024
+_token_locks: OrderedDict[int, asyncio.Lock] = OrderedDict()
+
+
+def _get_lock(user_id: int) -> asyncio.Lock:
+    """
+    Return the user's refresh lock, evicting the least recently used idle locks.
+
+    The function never awaits, so get-or-create is atomic on the event loop and
+    concurrent callers for one user always receive the same Lock.
+    """
+    lock = _token_locks.get(user_id)
+    if lock is not None:
+        _token_locks.move_to_end(user_id)
+        return lock
+
+    lock = asyncio.Lock()
+    _token_locks[user_id] = lock
+    if len(_token_locks) > TOKEN_LOCK_CACHE_MAX:
+        # Oldest entries first; a held lock must survive or two refreshes could race.
+        for key in list(_token_locks):
+            if len(_token_locks) <= TOKEN_LOCK_CACHE_MAX:
+                break
+            if not _token_locks[key].locked():
+                del _token_locks[key]
+    return lock
+
+
+# Tokens known to be valid until their deadline, so the common path skips the
+# DB read and credential decryption. Writers of users.mesh_token drop entries
+# via forget_cached_token().
+_token_cache: dict[int, tuple[str, datetime]] = {}
+
+
+def forget_cached_token(user_id: int) -> None:
+    """Drop the in-process token after it was replaced, invalidated or deleted."""
+    _token_cache.pop(user_id, None)
+
+
+def _get_cached_token(user_id: int) -> Optional[str]:
+    """Return the cached token while it is still before its refresh deadline."""
+    entry = _token_cache.get(user_id)
+    if entry is None:
+        return None
+    token, deadline = entry
+    if deadline > datetime.now():
+        return token
+    _token_cache.pop(user_id, None)
+    return None
 
 
 def _has_oauth_refresh_data(user: dict) -> bool:
@@ -25,6 +77,17 @@ def _has_oauth_refresh_data(user: dict) -> bool:
     )
 
 
+@lru_cache(maxsize=2048)
+def _expiry_deadline(token_expires_at: str) -> datetime:
+    """
+    Parse a stored expiry into the buffer-adjusted refresh deadline.
+
+    The same string is checked on every request until the token is refreshed,
+    so the parse and the buffer subtraction are done once per distinct value.
+    """
+    return datetime.fromisoformat(token_expires_at) - _EXPIRY_BUFFER
+
+
 def _is_token_valid(token_expires_at: Optional[str]) -> bool:
     """
     Check whether the token is still valid with a small safety buffer.
@@ -35,13 +98,12 @@ def _is_token_valid(token_expires_at: Optional[str]) -> bool:
         return False
 
     try:
-        expires_at = datetime.fromisoformat(token_expires_at)
+        deadline = _expiry_deadline(token_expires_at)
     except (ValueError, TypeError):
         logger.warning("Invalid token_expires_at format: %s", token_expires_at)
         return False
 
-    buffer = timedelta(minutes=TOKEN_EXPIRY_BUFFER_MINUTES)
-    return (expires_at - buffer) > datetime.now()
+    return deadline > datetime.now()
 
 
 def _is_forced_refresh(token_expires_at: Optional[str]) -> bool:
@@ -58,11 +120,20 @@ async def ensure_token(user_id: int) -> str:
     2. OAuth sessions are refreshed via refresh_token.
     3. Fallback sessions without OAuth are reused until the first real 401.
     4. After a real 401 or failed OAuth refresh, we do not trigger silent SMS login.
+
+    A token that was valid on the last call is served from memory without a DB read.
     """
-    if user_id not in _token_locks:
-        _token_locks[user_id] = asyncio.Lock()
+    cached_token = _get_cached_token(user_id)
+    if cached_token:
+        return cached_token
+
+    async with _get_lock(user_id):
+        # Re-check under the lock: if another coroutine just refreshed the token,
+        # waiters reuse it instead of reading the DB and refreshing again.
+        cached_token = _get_cached_token(user_id)
+        if cached_token:
+            return cached_token
 
-    async with _token_locks[user_id]:
         user = await get_user(user_id)
         if not user:
             logger.error("User not found: user_id=%d", user_id)
@@ -74,8 +145,10 @@ async def ensure_token(user_id: int) -> str:
         forced_refresh = _is_forced_refresh(token_expires_at)
 
         if current_token and _is_token_valid(token_expires_at):
+            _token_cache[user_id] = (current_token, _expiry_deadline(token_expires_at))
             return current_token
 
+        forget_cached_token(user_id)
         logger.info("Refreshing MeSH token for user_id=%d", user_id)
 
         # For fallback sessions we no longer trust the local 24h timer. Reuse the token
@@ -110,14 +183,15 @@ async def ensure_token(user_id: int) -> str:
                 )
                 new_token = result["token"]
                 new_refresh = result.get("refresh_token")
-                new_expires_at = (datetime.now() + timedelta(hours=24)).isoformat()
+                new_expires = datetime.now() + timedelta(hours=24)
 
                 await update_user_token(
                     user_id,
                     new_token,
-                    new_expires_at,
+                    new_expires.isoformat(),
                     mesh_refresh_token=new_refresh,
                 )
+                _token_cache[user_id] = (new_token, new_expires - _EXPIRY_BUFFER)
 
                 logger.info("Token refreshed via refresh_token for user_id=%d", user_id)
                 return new_token